@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "task",
+        "status",
+        "attempts",
+        "run_after",
+        "created",
+    )
+    list_filter = ("status", "task")
+    empty_value_display = "-пусто-"
+
+
+admin.site.register(Job, JobAdmin)
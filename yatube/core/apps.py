@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self):
+        from django.conf import settings
+        from django.template import base
+        from django.template.backends import django as backend
+
+        from . import instrumentation, templating
+
+        render = backend.Template.render
+        if not getattr(render, "instrumented", False):
+            backend.Template.render = instrumentation.timed_render(render)
+        render = base.Template.render
+        if not getattr(render, "instrumented", False):
+            base.Template.render = instrumentation.profiled_render(render)
+        if settings.TEMPLATE_PRECOMPILE:
+            templating.precompile()
@@ -0,0 +1,259 @@
+"""Общий для процессов одного хоста кэш в файле SQLite.
+
+В отличие от LocMemCache записи видят все воркеры: сигнал инвалидации
+из одного процесса доходит до остальных, а тёплый кэш не дублируется.
+Вытеснение — по давности последнего чтения (LRU) при превышении
+MAX_ENTRIES записей или MAX_SIZE байт; incr атомарен между процессами.
+Число и общий размер записей ведут триггеры в отдельной строке, поэтому
+запись в кэш не пересчитывает таблицу целиком.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+TABLE = "cache_entries"
+STATS = "cache_stats"
+# Отметку чтения обновляем не чаще раза в секунду: иначе каждое чтение
+# стало бы записью и брало блокировку базы.
+TOUCH_INTERVAL = 1
+# SQLite ограничивает число параметров запроса.
+BATCH_SIZE = 500
+SCHEMA = (
+    f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+    "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL, "
+    "accessed REAL NOT NULL, size INTEGER NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_accessed ON {TABLE} (accessed)",
+    f"CREATE INDEX IF NOT EXISTS {TABLE}_expires ON {TABLE} (expires)",
+    f"CREATE TABLE IF NOT EXISTS {STATS} ("
+    "id INTEGER PRIMARY KEY CHECK (id = 0), "
+    "count INTEGER NOT NULL, size INTEGER NOT NULL)",
+    # Файл кэша, созданный до появления счётчиков, считается один раз.
+    f"INSERT OR IGNORE INTO {STATS} (id, count, size) "
+    f"SELECT 0, count(*), total(size) FROM {TABLE} "
+    f"WHERE NOT EXISTS (SELECT 1 FROM {STATS})",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON {TABLE} "
+    f"BEGIN UPDATE {STATS} SET count = count + 1, size = size + NEW.size; "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON {TABLE} "
+    f"BEGIN UPDATE {STATS} SET count = count - 1, size = size - OLD.size; "
+    "END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_resize "
+    f"AFTER UPDATE OF size ON {TABLE} "
+    f"BEGIN UPDATE {STATS} SET size = size - OLD.size + NEW.size; END",
+)
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._max_size = int(options.get("MAX_SIZE", 64 * 1024 * 1024))
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение своё у каждого потока и процесса (после fork).
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            db = sqlite3.connect(self._path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            # REPLACE удаляет прежнюю запись; без этого на её удаление
+            # не сработал бы триггер и счётчики разошлись бы с таблицей.
+            db.execute("PRAGMA recursive_triggers=ON")
+            self._create_schema(db)
+            self._local.db = db
+            self._local.pid = pid
+        return self._local.db
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in SCHEMA:
+                db.execute(statement)
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @contextmanager
+    def _write(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _store(self, db, key, value, timeout, now, replace=True):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        cursor = db.execute(
+            f"{verb} INTO {TABLE} (key, value, expires, accessed, size) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, blob, self.get_backend_timeout(timeout), now, len(blob)),
+        )
+        return cursor.rowcount > 0
+
+    def _totals(self, db):
+        return db.execute(f"SELECT count, size FROM {STATS}").fetchone()
+
+    def _within_limits(self, count, size):
+        return count <= self._max_entries and size <= self._max_size
+
+    def _cull(self, db, now):
+        """Вытесняет записи сверх лимитов: сначала просроченные, затем LRU.
+
+        В пределах лимитов стоит одного чтения строки счётчиков.
+        """
+        if self._within_limits(*self._totals(db)):
+            return
+        db.execute(f"DELETE FROM {TABLE} WHERE expires <= ?", (now,))
+        count, size = self._totals(db)
+        if self._within_limits(count, size):
+            return
+        victims = []
+        rows = db.execute(f"SELECT key, size FROM {TABLE} ORDER BY accessed")
+        for key, entry_size in rows:
+            if self._within_limits(count, size):
+                break
+            victims.append((key,))
+            count -= 1
+            size -= entry_size
+        db.executemany(f"DELETE FROM {TABLE} WHERE key = ?", victims)
+
+    def _read(self, keys):
+        """{ключ: значение} для живых записей; освежает отметки чтения."""
+        db = self._connection()
+        now = time.time()
+        rows = []
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            rows += db.execute(
+                f"SELECT key, value, expires, accessed FROM {TABLE} "
+                f"WHERE key IN ({', '.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+        found = {}
+        stale = []
+        for key, blob, expires, accessed in rows:
+            if not self._alive(expires, now):
+                continue
+            found[key] = pickle.loads(blob)
+            if now - accessed > TOUCH_INTERVAL:
+                stale.append((now, key))
+        if stale:
+            db.executemany(
+                f"UPDATE {TABLE} SET accessed = ? WHERE key = ?", stale
+            )
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._read([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        mapping = {self._key(key, version): key for key in keys}
+        found = self._read(list(mapping))
+        return {mapping[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            self._store(db, key, value, timeout, now)
+            self._cull(db, now)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._write() as db:
+            for key, value in data.items():
+                self._store(
+                    db, self._key(key, version), value, timeout, now
+                )
+            self._cull(db, now)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            db.execute(
+                f"DELETE FROM {TABLE} WHERE key = ? AND expires <= ?",
+                (key, now),
+            )
+            added = self._store(db, key, value, timeout, now, replace=False)
+            if added:
+                self._cull(db, now)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute(
+                f"SELECT value, expires FROM {TABLE} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or not self._alive(row[1], now):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            db.execute(
+                f"UPDATE {TABLE} SET value = ?, accessed = ?, size = ? "
+                "WHERE key = ?",
+                (blob, now, len(blob), key),
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            cursor = db.execute(
+                f"UPDATE {TABLE} SET expires = ? WHERE key = ? "
+                "AND (expires IS NULL OR expires > ?)",
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            f"SELECT expires FROM {TABLE} WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            db.execute(f"DELETE FROM {TABLE} WHERE key = ?", (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        with self._write() as db:
+            db.executemany(f"DELETE FROM {TABLE} WHERE key = ?", keys)
+
+    def clear(self):
+        with self._write() as db:
+            db.execute(f"DELETE FROM {TABLE}")
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: закрывать его после каждого
+        # запроса значит заново открывать файл на следующем.
+        pass
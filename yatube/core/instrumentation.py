@@ -0,0 +1,307 @@
+"""Замеры запросов: SQL, шаблоны, кэш и общее время по именам URL.
+
+Текущий запрос копит цифры в RequestStats (thread-local), по завершении
+запись уходит в кольцевой буфер процесса, из которого aggregate()
+собирает сводку для служебной страницы.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .querylog import QueryLog
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_lock = threading.Lock()
+_buffer = None
+# Сколько самых тяжёлых шаблонов попадает в Server-Timing.
+TIMING_TEMPLATES = 3
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.batch_items = 0
+        self.batch_misses = 0
+        self._rendering = 0
+        self.templates = {} if settings.TEMPLATE_PROFILE else None
+        self._template_stack = []
+        self.querylog = QueryLog() if settings.QUERY_LOG else None
+
+    @property
+    def wall_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def execute(self, execute, sql, params, many, context):
+        """Обёртка для connection.execute_wrapper()."""
+        begin = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - begin) * 1000
+            self.queries += 1
+            self.sql_ms += ms
+            if self.querylog is not None:
+                self.querylog.add(sql, params, ms)
+
+
+def current():
+    return getattr(_local, "stats", None)
+
+
+def start():
+    _local.stats = RequestStats()
+    return _local.stats
+
+
+def stop():
+    _local.stats = None
+
+
+def count_cache(hit):
+    """Отмечает попадание или промах кэша в текущем запросе."""
+    stats = current()
+    if stats is None:
+        return
+    if hit:
+        stats.cache_hits += 1
+    else:
+        stats.cache_misses += 1
+
+
+def count_batch(size, misses):
+    """Отмечает пакетное чтение кэша: размер пачки и число промахов."""
+    stats = current()
+    if stats is None:
+        return
+    stats.batches += 1
+    stats.batch_items += size
+    stats.batch_misses += misses
+
+
+def timed_render(render):
+    """Оборачивает Template.render шаблонного бэкенда Django."""
+
+    def wrapper(self, *args, **kwargs):
+        stats = current()
+        if stats is None or stats._rendering:
+            return render(self, *args, **kwargs)
+        stats._rendering += 1
+        begin = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            stats.template_ms += (time.perf_counter() - begin) * 1000
+            stats._rendering -= 1
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def profiled_render(render):
+    """Оборачивает Template.render движка: шаблоны страниц и include.
+
+    Для каждого шаблона копятся число рендеров, полное время и
+    собственное время — без вложенных include.
+    """
+
+    def wrapper(self, context):
+        stats = current()
+        if stats is None or stats.templates is None:
+            return render(self, context)
+        stack = stats._template_stack
+        stack.append(0.0)
+        begin = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            ms = (time.perf_counter() - begin) * 1000
+            nested = stack.pop()
+            if stack:
+                stack[-1] += ms
+            name = self.origin.template_name or "<string>"
+            row = stats.templates.setdefault(
+                name, {"count": 0, "ms": 0.0, "self_ms": 0.0}
+            )
+            row["count"] += 1
+            row["ms"] += ms
+            row["self_ms"] += ms - nested
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def budget(name):
+    """Допустимые число запросов и время (мс) для имени URL."""
+    limits = {
+        "queries": settings.INSTRUMENTATION_QUERY_BUDGET,
+        "ms": settings.INSTRUMENTATION_TIME_BUDGET_MS,
+    }
+    limits.update(settings.INSTRUMENTATION_BUDGETS.get(name, {}))
+    return limits
+
+
+def _get_buffer():
+    global _buffer
+    size = settings.INSTRUMENTATION_BUFFER_SIZE
+    if _buffer is None or _buffer.maxlen != size:
+        _buffer = deque(_buffer or (), maxlen=size)
+    return _buffer
+
+
+def record(name, stats, status_code):
+    """Сохраняет замер в буфер; возвращает запись."""
+    limits = budget(name)
+    entry = {
+        "name": name,
+        "status": status_code,
+        "queries": stats.queries,
+        "sql_ms": round(stats.sql_ms, 3),
+        "template_ms": round(stats.template_ms, 3),
+        "cache_hits": stats.cache_hits,
+        "cache_misses": stats.cache_misses,
+        "batches": stats.batches,
+        "batch_items": stats.batch_items,
+        "batch_misses": stats.batch_misses,
+        "wall_ms": round(stats.wall_ms, 3),
+    }
+    if stats.templates is not None:
+        entry["templates"] = {
+            template: {
+                "count": row["count"],
+                "ms": round(row["ms"], 3),
+                "self_ms": round(row["self_ms"], 3),
+            }
+            for template, row in stats.templates.items()
+        }
+    entry["over_budget"] = (
+        entry["queries"] > limits["queries"] or entry["wall_ms"] > limits["ms"]
+    )
+    if entry["over_budget"]:
+        logger.warning(
+            "%s превысил бюджет: %s запросов, %.1f мс (лимит %s, %s мс)",
+            name, entry["queries"], entry["wall_ms"],
+            limits["queries"], limits["ms"],
+        )
+    with _lock:
+        _get_buffer().append(entry)
+    return entry
+
+
+def entries():
+    with _lock:
+        return list(_get_buffer())
+
+
+def reset():
+    with _lock:
+        _get_buffer().clear()
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[round(percent / 100 * (len(ordered) - 1))]
+
+
+def aggregate():
+    """Сводка по именам URL из буфера."""
+    grouped = {}
+    for entry in entries():
+        grouped.setdefault(entry["name"], []).append(entry)
+    summary = {}
+    for name, rows in sorted(grouped.items()):
+        wall = [row["wall_ms"] for row in rows]
+        summary[name] = {
+            "requests": len(rows),
+            "queries_mean": round(
+                statistics.mean(row["queries"] for row in rows), 2
+            ),
+            "queries_max": max(row["queries"] for row in rows),
+            "sql_ms_mean": round(
+                statistics.mean(row["sql_ms"] for row in rows), 3
+            ),
+            "template_ms_mean": round(
+                statistics.mean(row["template_ms"] for row in rows), 3
+            ),
+            "cache_hits": sum(row["cache_hits"] for row in rows),
+            "cache_misses": sum(row["cache_misses"] for row in rows),
+            "batch_size_mean": _ratio(
+                sum(row["batch_items"] for row in rows),
+                sum(row["batches"] for row in rows),
+            ),
+            "batch_miss_ratio": _ratio(
+                sum(row["batch_misses"] for row in rows),
+                sum(row["batch_items"] for row in rows),
+            ),
+            "wall_ms_p50": _percentile(wall, 50),
+            "wall_ms_p95": _percentile(wall, 95),
+            "over_budget": sum(row["over_budget"] for row in rows),
+            "budget": budget(name),
+            "templates": _templates(rows),
+        }
+    return summary
+
+
+def _ratio(part, total):
+    return round(part / total, 3) if total else None
+
+
+def _templates(rows):
+    """Средние на запрос по шаблонам, тяжёлые (по своему времени) первыми."""
+    totals = {}
+    for row in rows:
+        for template, stats in row.get("templates", {}).items():
+            total = totals.setdefault(
+                template, {"count": 0, "ms": 0.0, "self_ms": 0.0}
+            )
+            for field in total:
+                total[field] += stats[field]
+    ranked = sorted(
+        totals.items(), key=lambda item: item[1]["self_ms"], reverse=True
+    )
+    return {
+        template: {
+            "count_mean": round(total["count"] / len(rows), 2),
+            "ms_mean": round(total["ms"] / len(rows), 3),
+            "self_ms_mean": round(total["self_ms"] / len(rows), 3),
+        }
+        for template, total in ranked
+    }
+
+
+def server_timing(entry):
+    """Значение заголовка Server-Timing для записи."""
+    metrics = [
+        f'db;dur={entry["sql_ms"]};desc="{entry["queries"]} queries"',
+        f'tpl;dur={entry["template_ms"]}',
+        f'cache;desc="{entry["cache_hits"]} hits, '
+        f'{entry["cache_misses"]} misses"',
+        f'total;dur={entry["wall_ms"]}',
+    ]
+    if entry["batch_items"]:
+        metrics.append(
+            f'batch;desc="{entry["batch_items"]} items, '
+            f'{entry["batch_misses"]} misses"'
+        )
+    heaviest = sorted(
+        entry.get("templates", {}).items(),
+        key=lambda item: item[1]["self_ms"],
+        reverse=True,
+    )
+    for number, (template, row) in enumerate(heaviest[:TIMING_TEMPLATES]):
+        metrics.append(
+            f'tpl{number + 1};dur={row["self_ms"]};'
+            f'desc="{template} x{row["count"]}"'
+        )
+    return ", ".join(metrics)
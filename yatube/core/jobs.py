@@ -0,0 +1,95 @@
+"""Фоновая очередь заданий в базе данных.
+
+Задание — путь к функции и именованные аргументы в JSON. Поставленное
+внутри транзакции задание видно воркерам только после её коммита.
+Воркеры (manage.py run_jobs) забирают готовые задания условным UPDATE,
+поэтому их можно запускать сколько угодно. Упавшее задание повторяется
+с растущей паузой, после JOBS_MAX_ATTEMPTS остаётся в статусе failed;
+зависшее дольше JOBS_TIMEOUT снова выдаётся воркерам.
+"""
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger("core.jobs")
+
+
+def enqueue(task, **payload):
+    """Ставит в очередь вызов task(**payload); task — путь к функции."""
+    return Job.objects.create(
+        task=task, payload=json.dumps(payload, cls=DjangoJSONEncoder)
+    )
+
+
+def claim(limit):
+    """Забирает до limit готовых заданий; чужие не трогает."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_TIMEOUT)
+    ready = (
+        Job.objects.filter(
+            Q(status=Job.QUEUED, run_after__lte=now)
+            | Q(status=Job.RUNNING, started__lt=stale)
+        )
+        .order_by("run_after", "pk")
+        .values_list("pk", "status", "attempts")[:limit]
+    )
+    claimed = []
+    for pk, status, attempts in ready:
+        # Успеет только один воркер: остальные не найдут прежнее состояние.
+        taken = Job.objects.filter(
+            pk=pk, status=status, attempts=attempts
+        ).update(status=Job.RUNNING, started=now, attempts=attempts + 1)
+        if taken:
+            claimed.append(pk)
+    return list(Job.objects.filter(pk__in=claimed).order_by("pk"))
+
+
+def retry_delay(attempts):
+    return settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def run(job):
+    """Выполняет задание; True, если оно прошло."""
+    try:
+        import_string(job.task)(**json.loads(job.payload))
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+            job.status = Job.FAILED
+            logger.error("Задание %s не выполнено: %s", job, job.last_error)
+        else:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+            logger.warning("Задание %s будет повторено", job)
+        job.save(update_fields=("status", "run_after", "last_error"))
+        return False
+    job.delete()
+    return True
+
+
+def work(limit=None):
+    """Один проход воркера; возвращает число взятых заданий."""
+    jobs = claim(limit or settings.JOBS_BATCH_SIZE)
+    for job in jobs:
+        run(job)
+    return len(jobs)
+
+
+def work_forever(once=False):
+    while True:
+        if not work() and once:
+            return
+        if not once:
+            time.sleep(settings.JOBS_POLL_INTERVAL)
@@ -0,0 +1,64 @@
+"""Отправка писем через очередь core.jobs.
+
+QueuedEmailBackend только ставит письма в очередь, поэтому запрос
+(например, сброс пароля) не ждёт доставки. Воркер отправляет их одной
+пачкой через EMAIL_DELIVERY_BACKEND.
+"""
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from . import jobs
+
+SEND_TASK = "core.mail.send_messages"
+
+
+def delivery_connection():
+    """Соединение с настоящим бэкендом почты."""
+    return get_connection(settings.EMAIL_DELIVERY_BACKEND)
+
+
+def dump_message(message):
+    if message.attachments:
+        raise ValueError("Письма с вложениями очередь не принимает.")
+    return {
+        "subject": message.subject,
+        "body": message.body,
+        "from_email": message.from_email,
+        "to": message.to,
+        "cc": message.cc,
+        "bcc": message.bcc,
+        "reply_to": message.reply_to,
+        "headers": message.extra_headers,
+        "alternatives": getattr(message, "alternatives", []),
+    }
+
+
+def load_message(data):
+    alternatives = data.pop("alternatives")
+    message = EmailMultiAlternatives(**data)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    return message
+
+
+def send_messages(messages):
+    """Задание очереди: отправляет пачку писем одним соединением."""
+    with delivery_connection() as connection:
+        connection.send_messages([load_message(data) for data in messages])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        try:
+            jobs.enqueue(
+                SEND_TASK,
+                messages=[dump_message(message) for message in email_messages],
+            )
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(email_messages)
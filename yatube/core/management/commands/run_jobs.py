@@ -0,0 +1,38 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = "Воркер фоновой очереди: письма, уведомления подписчикам"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="выполнить готовые задания и выйти",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1, help="число процессов"
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] <= 1:
+            jobs.work_forever(options["once"])
+        else:
+            # Дочерние процессы не должны делить соединение родителя.
+            connections.close_all()
+            workers = [
+                multiprocessing.Process(
+                    target=jobs.work_forever, args=(options["once"],)
+                )
+                for _ in range(options["workers"])
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS("Очередь обработана"))
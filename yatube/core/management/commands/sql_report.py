@@ -0,0 +1,42 @@
+import fileinput
+
+from django.core.management.base import BaseCommand
+
+from core import querylog
+
+
+class Command(BaseCommand):
+    help = "Сводка по журналу SQL: медленные, повторные и N+1 запросы"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "logs", nargs="*", help="файлы журнала (по умолчанию stdin)"
+        )
+        parser.add_argument(
+            "--event",
+            choices=("slow_query", "duplicate_query", "n_plus_one"),
+            help="показать только события этого типа",
+        )
+        parser.add_argument("--top", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with fileinput.input(options["logs"] or ("-",)) as lines:
+            events = querylog.parse(lines)
+            if options["event"]:
+                events = (
+                    event for event in events
+                    if event["event"] == options["event"]
+                )
+            rows = querylog.report(events)
+        for row in rows[:options["top"]]:
+            self.stdout.write(
+                f"{row['event']} x{row['occurrences']}"
+                f" max={row['max_ms']}ms"
+                f" views={','.join(sorted(map(str, row['views'])))}"
+            )
+            self.stdout.write(f"  {row['sql']}")
+            for site in sorted(row["sites"]):
+                self.stdout.write(f"  at {site}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Всего запросов в сводке: {len(rows)}")
+        )
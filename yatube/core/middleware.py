@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import connection
+
+from . import instrumentation
+
+
+class InstrumentationMiddleware:
+    """Замеряет каждый запрос и пишет итог в буфер и Server-Timing."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.INSTRUMENTATION:
+            return self.get_response(request)
+        stats = instrumentation.start()
+        try:
+            with connection.execute_wrapper(stats.execute):
+                response = self.get_response(request)
+        finally:
+            instrumentation.stop()
+        match = request.resolver_match
+        name = match.view_name if match else "<unresolved>"
+        entry = instrumentation.record(name, stats, response.status_code)
+        if stats.querylog is not None:
+            stats.querylog.finish(name)
+        response["Server-Timing"] = instrumentation.server_timing(entry)
+        return response
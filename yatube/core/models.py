@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """Задание фоновой очереди: путь к функции и её аргументы в JSON."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "в очереди"),
+        (RUNNING, "выполняется"),
+        (FAILED, "не выполнено"),
+    )
+
+    task = models.CharField("Задача", max_length=200)
+    payload = models.TextField("Аргументы", default="{}")
+    status = models.CharField(
+        "Состояние", max_length=10, choices=STATUSES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    run_after = models.DateTimeField("Не раньше", default=timezone.now)
+    started = models.DateTimeField("Начато", null=True, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True, default="")
+    created = models.DateTimeField("Создано", auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task} #{self.pk}"
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("status", "run_after"), name="core_job_ready_idx"
+            ),
+        )
@@ -0,0 +1,147 @@
+"""Журнал медленных и повторяющихся SQL-запросов.
+
+QueryLog живёт в RequestStats текущего запроса и получает каждый запрос
+из обёртки connection.execute_wrapper(). В конце запроса finish() пишет
+в логгер core.sql события в JSON: slow_query, duplicate_query (один и тот
+же запрос с теми же параметрами) и n_plus_one (один запрос с разными
+параметрами много раз подряд). Сводку по логам строит команда sql_report.
+"""
+import json
+import logging
+import os
+import re
+import sys
+
+from django.conf import settings
+from django.template.base import Node
+
+logger = logging.getLogger("core.sql")
+
+IN_LIST_RE = re.compile(r"IN \((?:%s, )*%s\)")
+_OWN_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ("querylog.py", "instrumentation.py", "middleware.py")
+}
+
+
+def normalize(sql):
+    """Схлопывает списки IN, чтобы батчи разной длины считались одним."""
+    return IN_LIST_RE.sub("IN (...)", sql)
+
+
+def call_site():
+    """Строка кода проекта и строка шаблона, откуда пришёл запрос."""
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and (code is None or template is None):
+        filename = frame.f_code.co_filename
+        if (
+            code is None
+            and filename.startswith(settings.BASE_DIR)
+            and filename not in _OWN_FILES
+        ):
+            code = (
+                f"{os.path.relpath(filename, settings.BASE_DIR)}:"
+                f"{frame.f_lineno} in {frame.f_code.co_name}"
+            )
+        node = frame.f_locals.get("self")
+        if template is None and isinstance(node, Node):
+            token = getattr(node, "token", None)
+            origin = getattr(node, "origin", None)
+            if token is not None and origin is not None:
+                template = f"{origin.template_name}:{token.lineno}"
+        frame = frame.f_back
+    return {"code": code, "template": template}
+
+
+class QueryLog:
+    def __init__(self):
+        self.slow = []
+        self.seen = {}
+
+    def add(self, sql, params, ms):
+        key = normalize(sql)
+        entry = self.seen.setdefault(
+            key, {"count": 0, "params": {}, "site": None}
+        )
+        entry["count"] += 1
+        params = repr(params)
+        entry["params"][params] = entry["params"].get(params, 0) + 1
+        # Место вызова ищем только для повторов и медленных запросов:
+        # обход стека на каждый запрос слишком дорог.
+        if entry["count"] == 2:
+            entry["site"] = call_site()
+        if ms >= settings.SLOW_QUERY_MS:
+            self.slow.append(
+                {"sql": sql, "ms": round(ms, 3), "site": call_site()}
+            )
+
+    def events(self):
+        for query in self.slow:
+            yield {"event": "slow_query", **query}
+        for sql, entry in self.seen.items():
+            repeated = max(entry["params"].values())
+            if repeated >= settings.DUPLICATE_QUERY_THRESHOLD:
+                yield {
+                    "event": "duplicate_query",
+                    "sql": sql,
+                    "count": repeated,
+                    "site": entry["site"],
+                }
+            distinct = len(entry["params"])
+            if distinct >= settings.N_PLUS_ONE_THRESHOLD:
+                yield {
+                    "event": "n_plus_one",
+                    "sql": sql,
+                    "count": entry["count"],
+                    "distinct_params": distinct,
+                    "site": entry["site"],
+                }
+
+    def finish(self, view):
+        for event in self.events():
+            logger.warning(
+                json.dumps({"view": view, **event}, ensure_ascii=False)
+            )
+
+
+def parse(lines):
+    """События из строк лога: JSON начинается с первой «{»."""
+    for line in lines:
+        start = line.find("{")
+        if start == -1:
+            continue
+        try:
+            event = json.loads(line[start:])
+        except ValueError:
+            continue
+        if isinstance(event, dict) and "event" in event:
+            yield event
+
+
+def report(events):
+    """Сводка: событие и запрос -> частота, представления, места вызова."""
+    summary = {}
+    for event in events:
+        key = (event["event"], event["sql"])
+        row = summary.setdefault(
+            key,
+            {
+                "event": event["event"],
+                "sql": event["sql"],
+                "occurrences": 0,
+                "max_ms": 0,
+                "views": set(),
+                "sites": set(),
+            },
+        )
+        row["occurrences"] += 1
+        row["max_ms"] = max(row["max_ms"], event.get("ms", 0))
+        row["views"].add(event.get("view"))
+        site = event.get("site") or {}
+        row["sites"].add(
+            " / ".join(part for part in site.values() if part) or "?"
+        )
+    return sorted(
+        summary.values(), key=lambda row: (-row["occurrences"], row["sql"])
+    )
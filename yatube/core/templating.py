@@ -0,0 +1,58 @@
+"""Предкомпиляция шаблонов при старте процесса.
+
+С кэширующим загрузчиком скомпилированные шаблоны остаются в памяти
+процесса, и первый запрос к странице не платит за их разбор. Ошибка
+синтаксиса в любом шаблоне останавливает запуск, а не всплывает на
+редко открываемой странице.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateSyntaxError, engines
+
+EXTENSIONS = (".html", ".txt")
+
+
+def _leaf_loaders(loaders):
+    for loader in loaders:
+        nested = getattr(loader, "loaders", None)
+        if nested is None:
+            yield loader
+        else:
+            yield from _leaf_loaders(nested)
+
+
+def template_names(engine):
+    """Имена всех шаблонов в каталогах загрузчиков движка."""
+    names = set()
+    for loader in _leaf_loaders(engine.template_loaders):
+        for directory in loader.get_dirs():
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    if file.endswith(EXTENSIONS):
+                        path = os.path.relpath(
+                            os.path.join(root, file), directory
+                        )
+                        names.add(path.replace(os.sep, "/"))
+    return sorted(names)
+
+
+def precompile():
+    """Компилирует все шаблоны Django; возвращает их число."""
+    count = 0
+    errors = []
+    for backend in engines.all():
+        engine = getattr(backend, "engine", None)
+        if engine is None:
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except TemplateSyntaxError as error:
+                errors.append(f"{name}: {error}")
+            count += 1
+    if errors:
+        raise ImproperlyConfigured(
+            "Ошибки в шаблонах:\n" + "\n".join(errors)
+        )
+    return count
@@ -1,4 +1,25 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from time import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import instrumentation, jobs, querylog, templating
+from core.cache import SQLiteCache
+from core.models import Job
+from posts.models import Post
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -6,3 +27,289 @@ class ViewTestClass(TestCase):
         response = self.client.get("/nonexist-page/")
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, "core/404.html")
+
+    def test_csrf_failure_page(self):
+        client = Client(enforce_csrf_checks=True)
+        response = client.post(reverse("users:login"))
+        self.assertEqual(response.status_code, 403)
+        self.assertTemplateUsed(response, "core/403csrf.html")
+
+
+@override_settings(PAGE_CACHE=False)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        instrumentation.reset()
+
+    def test_records_request(self):
+        """Запрос попадает в буфер под именем URL и в Server-Timing."""
+        response = self.client.get(reverse("posts:index"))
+        self.assertIn("db;dur=", response["Server-Timing"])
+        self.client.get(reverse("posts:index"))
+        summary = instrumentation.aggregate()["posts:index"]
+        self.assertEqual(summary["requests"], 2)
+        self.assertGreater(summary["queries_max"], 0)
+        self.assertGreater(summary["template_ms_mean"], 0)
+        self.assertEqual(summary["cache_misses"], 1)
+        self.assertEqual(summary["cache_hits"], 1)
+
+    @override_settings(
+        INSTRUMENTATION_BUDGETS={"posts:index": {"queries": 0}}
+    )
+    def test_over_budget(self):
+        """Запрос сверх бюджета помечается и пишется в лог."""
+        with self.assertLogs("core.instrumentation", "WARNING"):
+            self.client.get(reverse("posts:index"))
+        self.assertEqual(
+            instrumentation.aggregate()["posts:index"]["over_budget"], 1
+        )
+
+    def test_template_profile(self):
+        """Профиль шаблонов: число и время рендеров каждого include."""
+        author = User.objects.create_user(username="author")
+        Post.objects.bulk_create(
+            Post(author=author, text=f"Пост {number}") for number in range(3)
+        )
+        response = self.client.get(reverse("posts:index"))
+        self.assertIn("tpl1;dur=", response["Server-Timing"])
+        templates = instrumentation.entries()[-1]["templates"]
+        self.assertEqual(templates["includes/post_card.html"]["count"], 3)
+        page = templates["posts/index.html"]
+        self.assertEqual(page["count"], 1)
+        self.assertLess(page["self_ms"], page["ms"])
+        summary = instrumentation.aggregate()["posts:index"]["templates"]
+        self.assertEqual(
+            summary["includes/post_card.html"]["count_mean"], 3
+        )
+
+    def test_metrics_staff_only(self):
+        """Сводка доступна только персоналу."""
+        url = reverse("core:metrics")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse("posts:index"))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("posts:index", response.json()["views"])
+
+
+@override_settings(PAGE_CACHE=False)
+class QueryLogTests(TestCase):
+    @override_settings(N_PLUS_ONE_THRESHOLD=3, DUPLICATE_QUERY_THRESHOLD=2)
+    def test_detects_repeats(self):
+        """Повторы и N+1 попадают в журнал с местом вызова."""
+        log = querylog.QueryLog()
+        log.add("SELECT 1 WHERE id = %s", (1,), 1)
+        log.add("SELECT 1 WHERE id = %s", (1,), 1)
+        for pk in (2, 3):
+            log.add("SELECT 1 WHERE id = %s", (pk,), 1)
+        log.add("SELECT 2 WHERE id IN (%s, %s)", (1, 2), 1)
+        log.add("SELECT 2 WHERE id IN (%s)", (3,), 1)
+        events = {event["event"]: event for event in log.events()}
+        self.assertEqual(events["duplicate_query"]["count"], 2)
+        self.assertEqual(events["n_plus_one"]["distinct_params"], 3)
+        self.assertIn("core/tests.py", events["n_plus_one"]["site"]["code"])
+        self.assertEqual(len(list(log.events())), 2)
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_and_report(self):
+        """Медленные запросы пишутся в JSON, который читает отчёт."""
+        with self.assertLogs("core.sql", "WARNING") as captured:
+            self.client.get(reverse("posts:index"))
+        events = list(querylog.parse(captured.output))
+        self.assertTrue(events)
+        self.assertEqual(
+            {event["view"] for event in events}, {"posts:index"}
+        )
+        rows = querylog.report(events)
+        self.assertEqual(rows[0]["views"], {"posts:index"})
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.location = os.path.join(self.directory, "cache.sqlite3")
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {"OPTIONS": options})
+
+    def test_shared_between_instances(self):
+        """Записи одного экземпляра видны другому (другому процессу)."""
+        first, second = self.make_cache(), self.make_cache()
+        first.set("key", {"value": 1})
+        self.assertEqual(second.get("key"), {"value": 1})
+        self.assertFalse(second.add("key", "other"))
+        second.delete("key")
+        self.assertIsNone(first.get("key"))
+        first.set_many({"a": 1, "b": 2})
+        self.assertEqual(second.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+
+    def test_expiry(self):
+        """Просроченные записи не отдаются и не мешают add."""
+        cache = self.make_cache()
+        cache.set("key", "value", timeout=-1)
+        self.assertIsNone(cache.get("key"))
+        self.assertTrue(cache.add("key", "new"))
+        self.assertEqual(cache.get("key"), "new")
+
+    def test_lru_eviction(self):
+        """Сверх лимита вытесняются давно не читанные записи."""
+        cache = self.make_cache(MAX_ENTRIES=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        with mock.patch("core.cache.time.time", return_value=time() + 10):
+            cache.get("a")
+            cache.set("c", 3)
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
+
+    def test_size_limit(self):
+        """Суммарный размер значений ограничен MAX_SIZE."""
+        cache = self.make_cache(MAX_SIZE=3000)
+        for index in range(5):
+            cache.set(f"key{index}", "x" * 1000)
+        self.assertEqual(len(cache.get_many(f"key{i}" for i in range(5))), 2)
+
+    def test_totals_follow_writes(self):
+        """Строка счётчиков совпадает с таблицей после любых записей."""
+        cache = self.make_cache()
+        cache.set("a", "x")
+        cache.set("a", "x" * 100)
+        cache.set_many({"b": 1, "c": 2})
+        cache.add("d", "y", timeout=-1)
+        cache.add("d", "z")
+        cache.incr("b", 10 ** 20)
+        cache.delete("c")
+        db = cache._connection()
+        actual = db.execute(
+            "SELECT count(*), total(size) FROM cache_entries"
+        ).fetchone()
+        self.assertEqual(cache._totals(db), (3, actual[1]))
+        cache.clear()
+        self.assertEqual(cache._totals(db), (0, 0))
+
+    def test_expired_culled_first(self):
+        """Сверх лимита первыми уходят просроченные записи."""
+        cache = self.make_cache(MAX_ENTRIES=2)
+        cache.set("old", 1, timeout=-1)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get_many(["a", "b"]), {"a": 1, "b": 2})
+
+    def test_atomic_incr(self):
+        """incr из разных потоков не теряет приращений."""
+        cache = self.make_cache()
+        cache.set("counter", 0)
+
+        def work():
+            worker = self.make_cache()
+            for _ in range(50):
+                worker.incr("counter")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.get("counter"), 200)
+        with self.assertRaises(ValueError):
+            cache.incr("missing")
+
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def fail(value):
+    raise RuntimeError(value)
+
+
+@override_settings(JOBS_MAX_ATTEMPTS=2, JOBS_RETRY_DELAY=60)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_run(self):
+        """Выполненное задание удаляется из очереди."""
+        jobs.enqueue("core.tests.record", value="done")
+        self.assertEqual(jobs.work(), 1)
+        self.assertEqual(CALLS, ["done"])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_once(self):
+        """Взятое задание не достаётся другому воркеру."""
+        jobs.enqueue("core.tests.record", value=1)
+        self.assertEqual(len(jobs.claim(10)), 1)
+        self.assertEqual(jobs.claim(10), [])
+
+    def test_retry_then_fail(self):
+        """Ошибка откладывает задание, после последней попытки — failed."""
+        job = jobs.enqueue("core.tests.fail", value="boom")
+        with self.assertLogs("core.jobs", "WARNING"):
+            jobs.work()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("boom", job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(jobs.work(), 0)
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs("core.jobs", "ERROR"):
+            jobs.work()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        Job.objects.update(run_after=timezone.now())
+        self.assertEqual(jobs.work(), 0)
+
+    def test_stale_reclaimed(self):
+        """Задание упавшего воркера выдаётся снова по таймауту."""
+        jobs.enqueue("core.tests.record", value="again")
+        jobs.claim(10)
+        Job.objects.update(started=timezone.now() - timedelta(days=1))
+        self.assertEqual(jobs.work(), 1)
+        self.assertEqual(CALLS, ["again"])
+
+
+@override_settings(
+    EMAIL_BACKEND="core.mail.QueuedEmailBackend",
+    EMAIL_DELIVERY_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class QueuedEmailTests(TestCase):
+    def test_password_reset(self):
+        """Письмо сброса пароля уходит воркером, а не в запросе."""
+        User.objects.create_user(
+            username="user", email="user@mail.ru", password="pass"
+        )
+        response = self.client.post(
+            reverse("users:password_reset"), {"email": "user@mail.ru"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        jobs.work()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["user@mail.ru"])
+
+
+class PrecompileTests(TestCase):
+    def test_project_templates(self):
+        """Все шаблоны проекта компилируются без ошибок."""
+        self.assertGreater(templating.precompile(), 0)
+
+    def test_syntax_error(self):
+        """Ошибка в любом шаблоне останавливает запуск."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, "broken.html"), "w") as file:
+            file.write("{% if %}")
+        templates = [
+            {
+                "BACKEND": "django.template.backends.django.DjangoTemplates",
+                "DIRS": [directory],
+            }
+        ]
+        with override_settings(TEMPLATES=templates):
+            with self.assertRaisesMessage(ImproperlyConfigured, "broken"):
+                templating.precompile()
@@ -1,12 +1,17 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import instrumentation
+
 
 def page_not_found(request, exception):
     return render(request, "core/404.html", {"path": request.path}, status=404)
 
 
 def csrf_failure(request, reason=""):
-    return render(request, "core/403csrf.html")
+    return render(request, "core/403csrf.html", status=403)
 
 
 def server_error(request):
@@ -15,3 +20,17 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, "core/403.html", status=403)
+
+
+@staff_member_required
+def metrics(request):
+    """Сводка замеров по именам URL для персонала."""
+    if request.method == "POST":
+        instrumentation.reset()
+    return JsonResponse(
+        {
+            "buffer_size": settings.INSTRUMENTATION_BUFFER_SIZE,
+            "views": instrumentation.aggregate(),
+        },
+        json_dumps_params={"ensure_ascii": False},
+    )
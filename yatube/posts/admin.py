@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
@@ -16,6 +17,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту идёт через поисковый индекс, а не LIKE."""
+        if not search_term:
+            return queryset, False
+        return queryset.filter(pk__in=search.search_ids(search_term)), False
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,286 @@
+"""JSON API лент, постов, комментариев и подписок.
+
+Те же модели и формы, что и у HTML-страниц. Списки листаются курсором
+(?cursor=), поля выбираются через ?fields=id,text,..., ответы отдаются
+с ETag (условный GET отвечает 304) и сжимаются gzip.
+
+Запись — от имени пользователя сессии; тело запроса — JSON-объект
+(Content-Type: application/json) или обычные поля формы. Как и формы
+сайта, она защищена
+от CSRF: клиент берёт токен у GET /api/v1/csrf/ (там же ставится cookie
+csrftoken) и передаёт его в заголовке X-CSRFToken. Ошибки, в том числе
+CSRF, 403 и 404, отдаются в JSON.
+"""
+import json
+from functools import wraps
+
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware, get_token
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
+
+from .forms import CommentForm, PostForm
+from .models import Follow, Post
+from .object_cache import get_group_by_slug, get_post, get_user_by_username
+from .pagination import keyset_slice
+from .timeline import follow_feed
+from .views import LIMIT_COMMENTS, LIMIT_POSTS
+
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author",
+    "group",
+    "image",
+    "thumbnail",
+)
+POST_DETAIL_FIELDS = POST_FIELDS + ("comments_count",)
+COMMENT_FIELDS = ("id", "author", "text", "created")
+
+
+class MalformedPayload(Exception):
+    """Тело запроса не разбирается как JSON-объект."""
+
+
+def api_view(*methods):
+    """Декоратор API: разрешённые методы, gzip, ошибки в JSON.
+
+    Аноним на запись получает 401 вместо редиректа на вход, запрос без
+    CSRF-токена — 403, битый JSON в теле — 400.
+    """
+
+    def decorator(view):
+        @csrf_exempt
+        @gzip_page
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET":
+                if not request.user.is_authenticated:
+                    return error("Требуется авторизация.", 401)
+                rejected = CsrfViewMiddleware().process_view(
+                    request, None, (), {}
+                )
+                if rejected is not None:
+                    return error(
+                        "Ошибка CSRF: токен отсутствует или неверен.", 403
+                    )
+            try:
+                return view(request, *args, **kwargs)
+            except MalformedPayload as exc:
+                return error(str(exc), 400)
+            except Http404:
+                return error("Не найдено.", 404)
+            except PermissionDenied:
+                return error("Недостаточно прав.", 403)
+
+        return wrapper
+
+    return decorator
+
+
+def error(message, status, errors=None):
+    data = {"detail": message}
+    if errors is not None:
+        data["errors"] = errors
+    return JsonResponse(
+        data, status=status, json_dumps_params={"ensure_ascii": False}
+    )
+
+
+def payload(request):
+    """Данные для формы: JSON-объект из тела или поля обычного POST."""
+    if request.content_type != "application/json":
+        return request.POST
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        raise MalformedPayload("Некорректный JSON.")
+    if not isinstance(data, dict):
+        raise MalformedPayload("Ожидается JSON-объект.")
+    return data
+
+
+def respond(request, data, status=200):
+    """JSON-ответ с ETag; на совпавший If-None-Match — 304."""
+    response = JsonResponse(
+        data, status=status, json_dumps_params={"ensure_ascii": False}
+    )
+    if request.method == "GET" and status == 200:
+        set_response_etag(response)
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
+    return response
+
+
+def requested_fields(request, available):
+    """Поля из ?fields=, ограниченные допустимыми."""
+    fields = request.GET.get("fields")
+    if not fields:
+        return available
+    chosen = tuple(name for name in fields.split(",") if name in available)
+    return chosen or available
+
+
+def serialize_post(post, fields):
+    values = {
+        "id": lambda: post.id,
+        "text": lambda: post.text,
+        "pub_date": lambda: post.pub_date.isoformat(),
+        "author": lambda: post.author.username,
+        "group": lambda: post.group.slug if post.group_id else None,
+        "image": lambda: post.image.url if post.image else None,
+        "thumbnail": lambda: post.thumbnail_urls.get("card"),
+        "comments_count": lambda: post.comments_count,
+    }
+    return {name: values[name]() for name in fields}
+
+
+def serialize_comment(comment, fields):
+    values = {
+        "id": lambda: comment.id,
+        "author": lambda: comment.author.username,
+        "text": lambda: comment.text,
+        "created": lambda: comment.created.isoformat(),
+    }
+    return {name: values[name]() for name in fields}
+
+
+def page(
+    request, queryset, field, per_page, serialize, available, descending
+):
+    """Порция списка по курсору и ссылка на следующую."""
+    rows, next_cursor = keyset_slice(
+        queryset, request.GET.get("cursor"), per_page, field, descending
+    )
+    fields = requested_fields(request, available)
+    next_url = None
+    if next_cursor:
+        query = request.GET.copy()
+        query["cursor"] = next_cursor
+        next_url = "%s?%s" % (request.path, query.urlencode())
+    return respond(
+        request,
+        {
+            "results": [serialize(row, fields) for row in rows],
+            "next": next_url,
+        },
+    )
+
+
+def feed(request, queryset):
+    return page(
+        request,
+        queryset,
+        "pub_date",
+        LIMIT_POSTS,
+        serialize_post,
+        POST_FIELDS,
+        descending=True,
+    )
+
+
+@api_view("GET")
+def csrf(request):
+    """Токен для заголовка X-CSRFToken; заодно ставит cookie csrftoken."""
+    return JsonResponse({"csrf_token": get_token(request)})
+
+
+@api_view("GET", "POST")
+def posts(request):
+    """Главная лента; POST создаёт пост."""
+    if request.method == "GET":
+        return feed(request, Post.objects.for_feed())
+    form = PostForm(payload(request), files=request.FILES or None)
+    if not form.is_valid():
+        return error(
+            "Некорректные данные.", 400, form.errors.get_json_data()
+        )
+    post = form.save(commit=False)
+    post.author = request.user
+    form.save()
+    return respond(
+        request, serialize_post(post, POST_DETAIL_FIELDS), status=201
+    )
+
+
+@api_view("GET")
+def group_posts(request, slug):
+    group = get_group_by_slug(slug)
+    return feed(request, group.posts.for_feed())
+
+
+@api_view("GET")
+def profile_posts(request, username):
+    author = get_user_by_username(username)
+    return feed(request, author.posts.for_feed())
+
+
+@api_view("GET")
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return error("Требуется авторизация.", 401)
+    return feed(request, follow_feed(request.user))
+
+
+@api_view("GET")
+def post_detail(request, post_id):
+    post = get_post(post_id)
+    return respond(
+        request,
+        serialize_post(post, requested_fields(request, POST_DETAIL_FIELDS)),
+    )
+
+
+@api_view("GET", "POST")
+def comments(request, post_id):
+    """Комментарии к посту, от старых к новым; POST добавляет."""
+    post = get_post(post_id)
+    if request.method == "POST":
+        form = CommentForm(payload(request))
+        if not form.is_valid():
+            return error(
+                "Некорректные данные.", 400, form.errors.get_json_data()
+            )
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+        return respond(
+            request,
+            serialize_comment(comment, COMMENT_FIELDS),
+            status=201,
+        )
+    return page(
+        request,
+        post.comments.select_related("author").only(
+            "text", "created", "post", "author", "author__username"
+        ),
+        "created",
+        LIMIT_COMMENTS,
+        serialize_comment,
+        COMMENT_FIELDS,
+        descending=False,
+    )
+
+
+@api_view("POST", "DELETE")
+def follow(request, username):
+    """POST — подписаться на автора, DELETE — отписаться."""
+    author = get_user_by_username(username)
+    if author == request.user:
+        return error("Нельзя подписаться на себя.", 400)
+    if request.method == "POST":
+        _, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        return respond(
+            request, {"following": True}, status=201 if created else 200
+        )
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return respond(request, {"following": False})
@@ -0,0 +1,216 @@
+"""Нагрузочные замеры основных страниц на локально засеянной базе.
+
+seed() наполняет базу, run() гоняет сценарии через тестовый клиент
+Django (со всеми middleware) и считает задержки, запросы к БД и
+пропускную способность, compare() сверяет результат с сохранённым
+эталоном. Команда manage.py benchmark собирает всё вместе.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from . import counters, object_cache, search, timeline
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SCENARIOS = (
+    "index",
+    "group_posts",
+    "profile",
+    "post_detail",
+    "follow_index",
+    "post_create",
+    "add_comment",
+)
+
+# Замеры идут на собственном кэше: --cold чистит его перед каждым
+# запросом, и общий кэш сайта при этом трогать нельзя.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "benchmark",
+    },
+}
+
+
+def seed(users=100, groups=10, posts=2000, comments=5000, follows=1000,
+         seed_value=0):
+    """Наполняет базу данными в обход сигналов, затем чинит счётчики.
+
+    Размер пачек bulk_create выбирает Django: явный batch_size он не
+    ограничивает, и на SQLite пачка больше 500 строк не вставляется.
+    """
+    rnd = random.Random(seed_value)
+    start = User.objects.count()
+    new_users = [User(username=f"bench{start + i}") for i in range(users)]
+    for user in new_users:
+        user.set_unusable_password()
+    User.objects.bulk_create(new_users)
+    user_ids = list(User.objects.values_list("pk", flat=True))
+
+    start = Group.objects.count()
+    Group.objects.bulk_create(
+        Group(title=f"Группа {start + i}", slug=f"bench-{start + i}")
+        for i in range(groups)
+    )
+    group_ids = list(Group.objects.values_list("pk", flat=True)) + [None]
+
+    words = ("пост", "котики", "погода", "новости", "яндекс", "практикум")
+    Post.objects.bulk_create(
+        Post(
+            author_id=rnd.choice(user_ids),
+            group_id=rnd.choice(group_ids),
+            text=" ".join(rnd.choices(words, k=12)),
+        )
+        for _ in range(posts)
+    )
+    post_ids = list(Post.objects.values_list("pk", flat=True))
+
+    if post_ids:
+        Comment.objects.bulk_create(
+            Comment(
+                post_id=rnd.choice(post_ids),
+                author_id=rnd.choice(user_ids),
+                text=" ".join(rnd.choices(words, k=6)),
+            )
+            for _ in range(comments)
+        )
+    Follow.objects.bulk_create(
+        (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in {
+                tuple(rnd.sample(user_ids, 2)) for _ in range(follows)
+            }
+        ),
+        ignore_conflicts=True,
+    )
+    counters.recount_all()
+    search.rebuild()
+    if timeline.is_enabled():
+        timeline.rebuild()
+
+
+def _requests(name, rnd):
+    """Бесконечный генератор (метод, url, данные) для сценария."""
+    post_ids = list(Post.objects.values_list("pk", flat=True)[:1000])
+    slugs = list(Group.objects.values_list("slug", flat=True))
+    usernames = list(
+        User.objects.filter(posts__isnull=False)
+        .values_list("username", flat=True)
+        .distinct()[:1000]
+    )
+    while True:
+        page = {"page": rnd.randint(1, 5)}
+        if name == "index":
+            yield "get", reverse("posts:index"), page
+        elif name == "group_posts":
+            slug = rnd.choice(slugs)
+            yield "get", reverse("posts:group_list", args=[slug]), page
+        elif name == "profile":
+            username = rnd.choice(usernames)
+            yield "get", reverse("posts:profile", args=[username]), page
+        elif name == "post_detail":
+            post_id = rnd.choice(post_ids)
+            yield "get", reverse("posts:post_detail", args=[post_id]), {}
+        elif name == "follow_index":
+            yield "get", reverse("posts:follow_index"), page
+        elif name == "post_create":
+            yield "post", reverse("posts:post_create"), {
+                "text": "Замер создания поста"
+            }
+        elif name == "add_comment":
+            post_id = rnd.choice(post_ids)
+            yield "post", reverse("posts:add_comment", args=[post_id]), {
+                "text": "Замер комментария"
+            }
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run_scenario(name, client, requests=100, warmup=10, cold=False,
+                 seed_value=0):
+    rnd = random.Random(seed_value)
+    plan = _requests(name, rnd)
+    for _ in range(warmup):
+        method, url, data = next(plan)
+        getattr(client, method)(url, data)
+    latencies = []
+    queries = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, url, data = next(plan)
+        if cold:
+            cache.clear()
+            object_cache.local_cache().clear()
+        with CaptureQueriesContext(connection) as captured:
+            begin = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            latencies.append((time.perf_counter() - begin) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{name}: {url} -> {response.status_code}")
+        queries.append(len(captured.captured_queries))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p90_ms": round(_percentile(latencies, 90), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "queries_mean": round(statistics.mean(queries), 2),
+        "queries_max": max(queries),
+        "rps": round(requests / elapsed, 2),
+    }
+
+
+def run(scenarios=SCENARIOS, **options):
+    """Прогоняет сценарии от имени самого активного подписчика.
+
+    Кэш на время замеров подменяется отдельным (CACHES).
+    """
+    reader = (
+        User.objects.filter(follower__isnull=False).first()
+        or User.objects.first()
+    )
+    with override_settings(CACHES=CACHES):
+        client = Client()
+        client.force_login(reader)
+        return {
+            name: run_scenario(name, client, **options) for name in scenarios
+        }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Список регрессий относительно эталона.
+
+    Задержки могут вырасти не больше чем на tolerance, число запросов
+    к БД расти не должно вовсе.
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ("p50_ms", "p90_ms"):
+            limit = reference[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {current[metric]} > {limit:.3f}"
+                )
+        if current["queries_max"] > reference["queries_max"]:
+            regressions.append(
+                f"{name}: queries_max {current['queries_max']}"
+                f" > {reference['queries_max']}"
+            )
+    return regressions
@@ -0,0 +1,73 @@
+"""Кэш отрендеренных карточек постов, общий для всех лент.
+
+Ключ карточки — id поста, поколения поста и его автора из object_cache
+(их сдвигают сигналы сохранения, в том числе правка в post_edit) и хэш
+исходников шаблонов карточки. Карточки страницы читаются одним
+get_many, недостающие рендерятся и пишутся одним set_many.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from core import instrumentation
+
+from . import feed_cache
+from .models import Post, User
+from .object_cache import model_scope, object_scope
+
+CARD_TEMPLATE = "includes/post_card.html"
+CARD_TEMPLATES = (CARD_TEMPLATE, "includes/post_image.html")
+CARD_KEY = "post_card:%s:%s"
+
+_template_version = None
+
+
+def template_version():
+    """Хэш исходников шаблонов карточки; с DEBUG — при каждом вызове."""
+    global _template_version
+    if _template_version is None or settings.DEBUG:
+        sources = "".join(
+            get_template(name).template.source for name in CARD_TEMPLATES
+        )
+        _template_version = hashlib.md5(sources.encode()).hexdigest()[:12]
+    return _template_version
+
+
+def card_keys(posts):
+    scopes = [model_scope(Post), model_scope(User)]
+    for post in posts:
+        scopes.append(object_scope(Post, post.pk))
+        scopes.append(object_scope(User, post.author_id))
+    generations = feed_cache.generations(scopes)
+    version = template_version()
+    keys = []
+    for number, post in enumerate(posts):
+        own = generations[2 + 2 * number:4 + 2 * number]
+        raw = ":".join(map(str, (*generations[:2], *own, version)))
+        digest = hashlib.md5(raw.encode()).hexdigest()
+        keys.append(CARD_KEY % (post.pk, digest))
+    return keys
+
+
+def attach(posts):
+    """Проставляет постам post.card; возвращает число отрендеренных."""
+    posts = list(posts)
+    if not posts:
+        return 0
+    keys = card_keys(posts)
+    found = cache.get_many(keys)
+    rendered = {}
+    for post, key in zip(posts, keys):
+        card = found.get(key)
+        instrumentation.count_cache(card is not None)
+        if card is None:
+            card = rendered[key] = render_to_string(
+                CARD_TEMPLATE, {"post": post}
+            )
+        post.card = mark_safe(card)
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_TTL)
+    return len(rendered)
@@ -0,0 +1,135 @@
+"""Условные ответы (ETag/Last-Modified) для лент и страницы поста.
+
+Валидаторы строятся из поколений и отметок изменения feed_cache, без
+рендера шаблонов: на совпавший If-None-Match или If-Modified-Since
+ответ 304 уходит до работы представления. Объекты, нужные и
+валидаторам, и представлению, грузятся один раз за запрос.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import feed_cache, object_cache
+
+
+def _memo(request, key, loader):
+    memo = request.__dict__.setdefault("_posts_objects", {})
+    if key not in memo:
+        memo[key] = loader()
+    return memo[key]
+
+
+def get_group(request, slug):
+    return _memo(
+        request,
+        ("group", slug),
+        lambda: object_cache.get_group_by_slug(slug),
+    )
+
+
+def get_author(request, username):
+    return _memo(
+        request,
+        ("author", username),
+        lambda: object_cache.get_user_by_username(username),
+    )
+
+
+def get_post(request, post_id):
+    return _memo(
+        request,
+        ("post", post_id),
+        lambda: object_cache.get_post(post_id),
+    )
+
+
+def index_scopes(request):
+    return [feed_cache.posts_scope()]
+
+
+def group_scopes(request, slug):
+    return [feed_cache.group_scope(get_group(request, slug).pk)]
+
+
+def profile_scopes(request, username):
+    return [feed_cache.author_scope(get_author(request, username).pk)]
+
+
+def post_scopes(request, post_id):
+    post = get_post(request, post_id)
+    return feed_cache.post_scopes(post.author_id, post.group_id, post.pk)
+
+
+def _validators(request, scopes_func, personal, *args, **kwargs):
+    """(ETag, Last-Modified) страницы; (None, None) для 404."""
+    if not hasattr(request, "_posts_validators"):
+        try:
+            scopes = scopes_func(request, *args, **kwargs)
+        except Http404:
+            request._posts_validators = None, None
+            return request._posts_validators
+        viewer = 0
+        if personal and request.user.is_authenticated:
+            viewer = request.user.pk
+        if viewer:
+            scopes.append(feed_cache.viewer_scope(viewer))
+        scopes.append(feed_cache.site_scope())
+        generations = feed_cache.generations(scopes)
+        request._posts_scopes = scopes, generations
+        parts = [request.get_full_path(), viewer, *scopes, *generations]
+        changed = feed_cache.last_changed(scopes)
+        if viewer:
+            # Формы страницы несут CSRF-токен, а вход выдаёт новый:
+            # страница из кэша браузера отправила бы устаревший.
+            parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""))
+            if request.user.last_login is not None:
+                changed = max(changed, request.user.last_login.timestamp())
+        raw = ":".join(str(part) for part in parts)
+        request._posts_validators = (
+            hashlib.md5(raw.encode()).hexdigest(),
+            datetime.fromtimestamp(int(changed), timezone.utc),
+        )
+    return request._posts_validators
+
+
+def conditional(scopes_func, personal=True):
+    """Отвечает 304, если страница не менялась.
+
+    personal — страница зависит от пользователя: валидаторы учитывают
+    его подписки, ответ получает Vary: Cookie.
+    """
+
+    def etag(request, *args, **kwargs):
+        return _validators(
+            request, scopes_func, personal, *args, **kwargs
+        )[0]
+
+    def last_modified(request, *args, **kwargs):
+        return _validators(
+            request, scopes_func, personal, *args, **kwargs
+        )[1]
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True)
+            if not personal:
+                return response
+            patch_vary_headers(response, ("Cookie",))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True)
+            return response
+
+        return wrapper
+
+    return decorator
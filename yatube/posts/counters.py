@@ -0,0 +1,114 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import feed_cache, object_cache
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _shift(queryset, **deltas):
+    """Атомарно сдвигает счётчики через F(), не опускаясь ниже нуля."""
+    updates = {}
+    for field, delta in deltas.items():
+        if delta < 0:
+            queryset = queryset.filter(**{f"{field}__gte": -delta})
+        updates[field] = F(field) + delta
+    return queryset.update(**updates)
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(pk=group_id), posts_count=delta)
+        object_cache.invalidate(Group, group_id)
+
+
+def shift_post(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), comments_count=delta)
+    object_cache.invalidate(Post, post_id)
+
+
+def shift_user(user_id, **deltas):
+    """Сдвигает счётчики пользователя, при росте создаёт строку UserStats."""
+    object_cache.invalidate(User, user_id)
+    if _shift(UserStats.objects.filter(user_id=user_id), **deltas):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        UserStats.objects.get_or_create(user_id=user_id, defaults=deltas)
+
+
+COUNT_KEY = "approximate_count:%s"
+
+
+def approximate_count(name, queryset):
+    """Число строк queryset с устарелостью не больше COUNT_MAX_STALENESS.
+
+    Выборки меньше COUNT_EXACT_BELOW считаются точно при каждом вызове.
+    Большие — COUNT(*) раз в COUNT_MAX_STALENESS секунд, а между
+    пересчётами значение в кэше сдвигает shift_count() из сигналов.
+    """
+    key = COUNT_KEY % name
+    value = cache.get(key)
+    if value is None:
+        value = queryset.count()
+        if value >= settings.COUNT_EXACT_BELOW:
+            cache.add(key, value, settings.COUNT_MAX_STALENESS)
+    return value
+
+
+def shift_count(name, delta):
+    try:
+        cache.incr(COUNT_KEY % name, delta)
+    except ValueError:
+        pass
+
+
+def posts_count():
+    """Число всех постов для пагинатора главной страницы."""
+    return approximate_count("posts", Post.objects.all())
+
+
+def follow_count(user, queryset):
+    """Число постов ленты подписок; подписка или отписка сбрасывают его."""
+    scope = feed_cache.viewer_scope(user.pk)
+    generation = feed_cache.generations([scope])[0]
+    return approximate_count(f"{scope}:{generation}", queryset)
+
+
+def _count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def recount_all():
+    """Пересчитывает все счётчики заново; возвращает число строк."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk)
+            for pk in User.objects.filter(stats__isnull=True).values_list(
+                "pk", flat=True
+            )
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    for model in (Group, Post, User):
+        object_cache.invalidate_model(model)
+    cache.delete(COUNT_KEY % "posts")
+    return {
+        "groups": Group.objects.update(posts_count=_count(Post, "group")),
+        "posts": Post.objects.update(
+            comments_count=_count(Comment, "post")
+        ),
+        "users": UserStats.objects.update(
+            posts_count=_count(Post, "author"),
+            followers_count=_count(Follow, "author"),
+            following_count=_count(Follow, "user"),
+        ),
+    }
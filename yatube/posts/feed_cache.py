@@ -0,0 +1,181 @@
+"""Кэш фрагментов лент с инвалидацией через счётчики поколений.
+
+Ключ включает поколения затронутых областей (все посты, группа, автор,
+зритель); сигналы сдвигают поколение, и старые ключи вытесняются по TTL.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import instrumentation
+
+INDEX = "index"
+GROUP = "group"
+PROFILE = "profile"
+FOLLOW = "follow"
+FEEDS = (INDEX, GROUP, PROFILE, FOLLOW)
+
+GENERATION_KEY = "feed_cache:gen:%s"
+CHANGED_KEY = "feed_cache:changed:%s"
+STATS_KEY = "feed_cache:%s:%s"
+
+
+def _scope(name, pk=None):
+    return name if pk is None else f"{name}:{pk}"
+
+
+def site_scope():
+    """Любая страница: массовые изменения в обход сигналов."""
+    return _scope("site")
+
+
+def posts_scope():
+    """Любой пост: главная страница и ленты подписок."""
+    return _scope("posts")
+
+
+def group_scope(group_id):
+    return _scope("group", group_id)
+
+
+def author_scope(author_id):
+    return _scope("author", author_id)
+
+
+def viewer_scope(user_id):
+    return _scope("viewer", user_id)
+
+
+def post_scope(post_id):
+    """Страница поста: сам пост и комментарии к нему."""
+    return _scope("post", post_id)
+
+
+def post_scopes(author_id, group_id, post_id=None):
+    """Области, которые затрагивает изменение поста."""
+    scopes = [posts_scope(), author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    if post_id is not None:
+        scopes.append(post_scope(post_id))
+    return scopes
+
+
+def _new_generation():
+    # Поколение начинается с текущего времени: если счётчик вытеснят из
+    # кэша, новое значение не совпадёт ни с одним из прежних.
+    return int(time.time() * 1000)
+
+
+def generations(scopes):
+    keys = [GENERATION_KEY % scope for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    for key, value in missing.items():
+        cache.add(key, value, None)
+    found.update(missing)
+    return [found[key] for key in keys]
+
+
+def last_changed(scopes):
+    """Время последнего изменения областей (unix time).
+
+    Если отметка вытеснена из кэша, изменением считается текущий момент.
+    """
+    keys = [CHANGED_KEY % scope for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in found}
+    for key, value in missing.items():
+        cache.add(key, value, None)
+    found.update(missing)
+    return max(found.values())
+
+
+def bump(*scopes):
+    """Инвалидирует все фрагменты, зависящие от перечисленных областей."""
+    for scope in scopes:
+        key = GENERATION_KEY % scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _new_generation(), None)
+    now = time.time()
+    cache.set_many({CHANGED_KEY % scope: now for scope in scopes}, None)
+
+
+class FeedFragment:
+    """Ключ и время жизни закэшированного фрагмента ленты."""
+
+    def __init__(self, feed, key, ttl):
+        self.feed = feed
+        self.key = key
+        self.ttl = ttl
+
+    def get(self):
+        fragment = cache.get(self.key)
+        instrumentation.count_cache(fragment is not None)
+        _count(self.feed, "hits" if fragment is not None else "misses")
+        return fragment
+
+    def set(self, fragment):
+        cache.set(self.key, fragment, self.ttl)
+
+
+def fragment(feed, page_obj, group=None, author=None, viewer=None):
+    """Описание фрагмента ленты для тега {% feedcache %}."""
+    scopes = [site_scope()]
+    if feed in (INDEX, FOLLOW):
+        scopes.append(posts_scope())
+    if group is not None:
+        scopes.append(group_scope(group.pk))
+    if author is not None:
+        scopes.append(author_scope(author.pk))
+    if viewer is not None:
+        scopes.append(viewer_scope(viewer.pk))
+    page = getattr(page_obj, "cursor", None) or page_obj.number
+    per_page = page_obj.paginator.per_page
+    raw = ":".join(
+        str(part)
+        for part in (*scopes, page, per_page, *generations(scopes))
+    )
+    digest = hashlib.md5(raw.encode()).hexdigest()
+    return FeedFragment(
+        feed, f"feed_cache:{feed}:{digest}", settings.FEED_CACHE_TTL
+    )
+
+
+def _count(feed, outcome):
+    key = STATS_KEY % (feed, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def stats():
+    """Попадания и промахи кэша по типам лент."""
+    keys = [
+        STATS_KEY % (feed, outcome)
+        for feed in FEEDS
+        for outcome in ("hits", "misses")
+    ]
+    values = cache.get_many(keys)
+    return {
+        feed: {
+            outcome: values.get(STATS_KEY % (feed, outcome), 0)
+            for outcome in ("hits", "misses")
+        }
+        for feed in FEEDS
+    }
+
+
+def reset_stats():
+    cache.delete_many(
+        [
+            STATS_KEY % (feed, outcome)
+            for feed in FEEDS
+            for outcome in ("hits", "misses")
+        ]
+    )
@@ -1,6 +1,9 @@
 from django import forms
+from django.http import Http404
 
-from .models import Comment, Post
+from . import thumbnails
+from .models import Comment, Group, Post
+from .object_cache import get_user_by_username
 
 
 class PostForm(forms.ModelForm):
@@ -18,6 +21,15 @@ class PostForm(forms.ModelForm):
             "image": "Картинка, которая будет в посте",
         }
 
+    def save(self, commit=True):
+        image_changed = "image" in self.changed_data
+        if image_changed:
+            self.instance.thumbnails = ""
+        post = super().save(commit)
+        if commit and image_changed:
+            thumbnails.schedule(post)
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -29,3 +41,24 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             "text": "Напишите текст нового комментария",
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label="Поиск", max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        to_field_name="slug",
+        required=False,
+        label="Группа",
+        empty_label="Все группы",
+    )
+    author = forms.CharField(label="Автор", max_length=150, required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data["author"]
+        if not username:
+            return None
+        try:
+            return get_user_by_username(username)
+        except Http404:
+            raise forms.ValidationError("Такого автора нет.")
@@ -0,0 +1,103 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет задержки, запросы к БД и пропускную способность "
+        "основных страниц на отдельной засеянной базе SQLite"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--groups", type=int, default=10)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--comments", type=int, default=5000)
+        parser.add_argument("--follows", type=int, default=1000)
+        parser.add_argument(
+            "--requests", type=int, default=100,
+            help="число замеряемых запросов на сценарий",
+        )
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument(
+            "--scenario", action="append", choices=benchmark.SCENARIOS,
+            help="замерить только этот сценарий (можно повторять)",
+        )
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="очищать кэш перед каждым запросом",
+        )
+        parser.add_argument(
+            "--db", default="benchmark.sqlite3",
+            help="файл базы для замеров",
+        )
+        parser.add_argument(
+            "--keepdb", action="store_true",
+            help="не удалять базу и не засевать её повторно",
+        )
+        parser.add_argument("--output", help="записать результат в JSON")
+        parser.add_argument("--baseline", help="эталон для сравнения")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="допустимый рост задержек, доля (по умолчанию 0.2)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Замеры рассчитаны на SQLite.")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+
+        old_name = connection.settings_dict["NAME"]
+        connection.settings_dict["TEST"]["NAME"] = options["db"]
+        keepdb = options["keepdb"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb
+        )
+        try:
+            with override_settings(
+                CACHES=benchmark.CACHES, POST_THUMBNAIL_ASYNC=False
+            ):
+                results = self.measure(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, 0, keepdb)
+
+        report = json.dumps(results, indent=2, ensure_ascii=False)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(report)
+        self.stdout.write(report)
+
+        if baseline is not None:
+            regressions = benchmark.compare(
+                results, baseline, options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Регрессии относительно эталона:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("Регрессий нет"))
+
+    def measure(self, options):
+        if not (options["keepdb"] and benchmark.Post.objects.exists()):
+            benchmark.seed(
+                users=options["users"],
+                groups=options["groups"],
+                posts=options["posts"],
+                comments=options["comments"],
+                follows=options["follows"],
+            )
+        return benchmark.run(
+            scenarios=options["scenario"] or benchmark.SCENARIOS,
+            requests=options["requests"],
+            warmup=options["warmup"],
+            cold=options["cold"],
+        )
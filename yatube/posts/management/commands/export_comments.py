@@ -0,0 +1,6 @@
+from posts.bulk import ExportCommand
+
+
+class Command(ExportCommand):
+    help = "Выгружает комментарии в JSONL или CSV"
+    kind = "comments"
@@ -0,0 +1,6 @@
+from posts.bulk import ExportCommand
+
+
+class Command(ExportCommand):
+    help = "Выгружает подписки в JSONL или CSV"
+    kind = "follows"
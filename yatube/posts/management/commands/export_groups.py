@@ -0,0 +1,6 @@
+from posts.bulk import ExportCommand
+
+
+class Command(ExportCommand):
+    help = "Выгружает группы в JSONL или CSV"
+    kind = "groups"
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания и промахи кэша лент"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="обнулить счётчики"
+        )
+
+    def handle(self, *args, **options):
+        for feed, counts in feed_cache.stats().items():
+            total = counts["hits"] + counts["misses"]
+            ratio = counts["hits"] / total if total else 0
+            self.stdout.write(
+                f"{feed}: hits={counts['hits']} misses={counts['misses']} "
+                f"hit_ratio={ratio:.2%}"
+            )
+        if options["reset"]:
+            feed_cache.reset_stats()
@@ -0,0 +1,6 @@
+from posts.bulk import ImportCommand
+
+
+class Command(ImportCommand):
+    help = "Загружает подписки из JSONL или CSV порциями через bulk_create"
+    kind = "follows"
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = "Перестраивает поисковый индекс постов"
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        with transaction.atomic():
+            total = backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{type(backend).__name__}: проиндексировано постов {total}"
+            )
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "users", nargs="*", type=int, help="id пользователей"
+        )
+
+    def handle(self, *args, **options):
+        if not timeline.is_enabled():
+            raise CommandError("Включите TIMELINE_FANOUT в настройках")
+        with transaction.atomic():
+            total = timeline.rebuild(options["users"] or None)
+        self.stdout.write(
+            self.style.SUCCESS(f"Ленты пересобраны, подписок: {total}")
+        )
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from core import instrumentation
+
+from . import feed_cache
+
+PAGE_KEY = "page_cache:%s"
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэш целых страниц для анонимных читателей.
+
+    Стоит до сессий, аутентификации и CSRF: попадание отдаётся без них.
+    Кэшируются только страницы с валидаторами posts.conditional; запись
+    хранит поколения их областей и перестаёт подходить, как только
+    сигнал сдвинет любое из них. Запросы с cookie сессии или сообщений
+    идут мимо кэша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.cacheable(request):
+            return self.get_response(request)
+        key = PAGE_KEY % hashlib.md5(
+            (request.get_host() + request.get_full_path()).encode()
+        ).hexdigest()
+        entry = cache.get(key)
+        if entry is not None and (
+            feed_cache.generations(entry["scopes"]) == entry["generations"]
+        ):
+            instrumentation.count_cache(True)
+            # Обработчик URL не разбирал: без этого попадание попало бы
+            # в метрики InstrumentationMiddleware как "<unresolved>".
+            request.resolver_match = resolve(
+                request.path_info, getattr(request, "urlconf", None)
+            )
+            return self.restore(request, entry)
+        instrumentation.count_cache(False)
+        response = self.get_response(request)
+        self.store(request, response, key)
+        return response
+
+    @staticmethod
+    def cacheable(request):
+        if not settings.PAGE_CACHE or request.method != "GET":
+            return False
+        cookies = (settings.SESSION_COOKIE_NAME, CookieStorage.cookie_name)
+        return not any(name in request.COOKIES for name in cookies)
+
+    @staticmethod
+    def store(request, response, key):
+        scopes = getattr(request, "_posts_scopes", None)
+        if (
+            scopes is None
+            or response.status_code != 200
+            or response.streaming
+            or response.cookies
+            or request.user.is_authenticated
+        ):
+            return
+        cache.set(
+            key,
+            {
+                "scopes": scopes[0],
+                "generations": scopes[1],
+                "content": response.content,
+                "headers": list(response.items()),
+            },
+            settings.PAGE_CACHE_TTL,
+        )
+
+    @staticmethod
+    def restore(request, entry):
+        response = HttpResponse(entry["content"])
+        for header, value in entry["headers"]:
+            response[header] = value
+        return get_conditional_response(
+            request,
+            etag=response.get("ETag"),
+            last_modified=parse_http_date_safe(response.get("Last-Modified")),
+            response=response,
+        )
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    """Заполняет счётчики из 0014 по уже существующим строкам."""
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    Group = apps.get_model("posts", "Group")
+    Post = apps.get_model("posts", "Post")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserStats = apps.get_model("posts", "UserStats")
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=pk)
+            for pk in User.objects.filter(stats__isnull=True).values_list(
+                "pk", flat=True
+            )
+        ),
+        batch_size=500,
+    )
+    Group.objects.update(posts_count=_count(Post, "group"))
+    Post.objects.update(comments_count=_count(Comment, "post"))
+    UserStats.objects.update(
+        posts_count=_count(Post, "author"),
+        followers_count=_count(Follow, "author"),
+        following_count=_count(Follow, "user"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
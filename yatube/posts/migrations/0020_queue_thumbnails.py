@@ -0,0 +1,42 @@
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def queue_thumbnails(apps, schema_editor):
+    """Ставит в очередь миниатюры картинок, загруженных до 0016.
+
+    Задания выполняет manage.py run_jobs; до их выполнения шаблоны
+    показывают заглушку.
+    """
+    Job = apps.get_model("core", "Job")
+    Post = apps.get_model("posts", "Post")
+    post_ids = (
+        Post.objects.exclude(image="")
+        .filter(thumbnails="")
+        .values_list("pk", flat=True)
+    )
+    Job.objects.bulk_create(
+        (
+            Job(
+                task="posts.thumbnails.generate",
+                payload=json.dumps({"post_id": post_id}),
+            )
+            for post_id in post_ids.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('posts', '0019_backfill_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(queue_thumbnails, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,23 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
 
+class AtomicSaveModel(models.Model):
+    """Запись и обновление счётчиков в post_save идут одной транзакцией."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -17,12 +31,36 @@ class Group(models.Model):
         verbose_name="Описание группы",
         help_text="Опишите о чем эта группа",
     )
+    posts_count = models.PositiveIntegerField(
+        "Число постов", default=0, editable=False
+    )
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    FEED_FIELDS = (
+        "id",
+        "text",
+        "pub_date",
+        "image",
+        "thumbnails",
+        "author__id",
+        "author__username",
+        "author__first_name",
+        "author__last_name",
+        "group__id",
+        "group__title",
+        "group__slug",
+    )
+
+    def for_feed(self):
+        """Посты для ленты: автор и группа подтягиваются одним JOIN."""
+        return self.select_related("author", "group").only(*self.FEED_FIELDS)
+
+
+class Post(AtomicSaveModel):
     text = models.TextField("Текст поста", help_text="Введите текст поста")
     pub_date = models.DateTimeField("Дата публикации", auto_now_add=True)
     author = models.ForeignKey(
@@ -42,15 +80,44 @@ class Post(models.Model):
     )
 
     image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    thumbnails = models.TextField(
+        "Миниатюры",
+        blank=True,
+        default="",
+        editable=False,
+        help_text="Адреса готовых миниатюр картинки в JSON",
+    )
+
+    comments_count = models.PositiveIntegerField(
+        "Число комментариев", default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return self.text[:15]
 
+    @cached_property
+    def thumbnail_urls(self):
+        """Готовые миниатюры {имя размера: url}; пусто, пока не сделаны."""
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
     class Meta:
         ordering = ["-pub_date"]
+        indexes = (
+            models.Index(fields=("-pub_date", "-id"), name="post_feed_idx"),
+            models.Index(
+                fields=("group", "-pub_date", "-id"),
+                name="post_group_feed_idx",
+            ),
+            models.Index(
+                fields=("author", "-pub_date", "-id"),
+                name="post_author_feed_idx",
+            ),
+        )
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveModel):
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name="comments"
     )
@@ -69,8 +136,15 @@ class Comment(models.Model):
     def __str__(self):
         return self.text
 
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=("post", "created"), name="comment_post_created_idx"
+            ),
+        )
+
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -92,3 +166,76 @@ class Follow(models.Model):
                 name="unique_follow",
             ),
         )
+        indexes = (
+            models.Index(
+                fields=("author", "user"), name="follow_author_user_idx"
+            ),
+        )
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок (fan-out on write)."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    "user",
+                    "post",
+                ),
+                name="unique_timeline_entry",
+            ),
+        )
+
+
+class SearchPosting(models.Model):
+    """Вхождение слова в пост для поиска без FTS5."""
+
+    term = models.CharField(max_length=64, db_index=True)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="search_postings",
+    )
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    "term",
+                    "post",
+                ),
+                name="unique_search_posting",
+            ),
+        )
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    posts_count = models.PositiveIntegerField("Число постов", default=0)
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков", default=0
+    )
+    following_count = models.PositiveIntegerField("Число подписок", default=0)
+
+    def __str__(self):
+        return str(self.user)
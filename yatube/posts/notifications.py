@@ -0,0 +1,55 @@
+"""Письма подписчикам о новых постах через очередь core.jobs.
+
+Сигнал ставит одно задание на пост; оно делит подписчиков с почтой на
+пачки по NOTIFY_BATCH_SIZE, и каждая пачка — отдельное задание, которое
+повторяется при сбое независимо от остальных.
+"""
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.urls import reverse
+from django.utils.text import Truncator
+
+from core import jobs
+from core.mail import delivery_connection
+
+from .bulk import chunks
+from .models import Follow, Post, User
+
+NOTIFY_TASK = "posts.notifications.notify_followers"
+BATCH_TASK = "posts.notifications.send_batch"
+
+
+def notify_followers(post_id):
+    author_id = (
+        Post.objects.filter(pk=post_id)
+        .values_list("author_id", flat=True)
+        .first()
+    )
+    if author_id is None:
+        return
+    followers = (
+        Follow.objects.filter(author_id=author_id)
+        .exclude(user__email="")
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+    )
+    for batch in chunks(followers.iterator(), settings.NOTIFY_BATCH_SIZE):
+        jobs.enqueue(BATCH_TASK, post_id=post_id, user_ids=batch)
+
+
+def send_batch(post_id, user_ids):
+    post = Post.objects.select_related("author").filter(pk=post_id).first()
+    if post is None:
+        return
+    author = post.author.get_full_name() or post.author.username
+    url = settings.SITE_URL + reverse("posts:post_detail", args=[post_id])
+    subject = f"Новый пост: {author}"
+    body = f"{Truncator(post.text).chars(200)}\n\nЧитать: {url}"
+    emails = (
+        User.objects.filter(pk__in=user_ids)
+        .exclude(email="")
+        .values_list("email", flat=True)
+    )
+    messages = [EmailMessage(subject, body, to=[email]) for email in emails]
+    with delivery_connection() as connection:
+        connection.send_messages(messages)
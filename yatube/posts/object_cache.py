@@ -0,0 +1,304 @@
+"""Двухуровневый кэш горячих объектов: групп, пользователей и постов.
+
+L1 — небольшой LRU в памяти процесса, L2 — общий кэш Django. Ключ
+объекта включает поколения модели и самого объекта (те же счётчики, что
+у feed_cache), так что сигнал сохранения или удаления делает старые
+записи недостижимыми на обоих уровнях во всех процессах сразу. Поиск по
+slug или username сначала находит id, затем объект по id.
+"""
+import pickle
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from core import instrumentation
+
+from . import feed_cache
+from .models import Group, Post, User
+
+
+class LRUCache:
+    """Ограниченный по числу записей словарь с вытеснением старейших."""
+
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_local = None
+
+
+def local_cache():
+    global _local
+    if _local is None or _local.size != settings.OBJECT_CACHE_L1_SIZE:
+        _local = LRUCache(settings.OBJECT_CACHE_L1_SIZE)
+    return _local
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def model_scope(model):
+    return f"object:{_label(model)}"
+
+
+def object_scope(model, pk):
+    return f"object:{_label(model)}:{pk}"
+
+
+def invalidate(model, pk):
+    """Сбрасывает объект во всех процессах.
+
+    Поколение сдвигается сразу и ещё раз после коммита: иначе запрос,
+    прочитавший старую строку до коммита, положил бы её под новый ключ.
+    """
+    scope = object_scope(model, pk)
+    feed_cache.bump(scope)
+    transaction.on_commit(lambda: feed_cache.bump(scope))
+
+
+def invalidate_model(model):
+    feed_cache.bump(model_scope(model))
+
+
+def _keys(model, pks):
+    """Ключи объектов; поколения читаются одним get_many."""
+    scopes = [model_scope(model)]
+    scopes.extend(object_scope(model, pk) for pk in pks)
+    generations = feed_cache.generations(scopes)
+    return [
+        f"{scope}:{generations[0]}:{generation}"
+        for scope, generation in zip(scopes[1:], generations[1:])
+    ]
+
+
+def _key(model, pk):
+    return _keys(model, [pk])[0]
+
+
+def _fetch(key):
+    blob = local_cache().get(key)
+    if blob is None:
+        blob = cache.get(key)
+        if blob is not None:
+            local_cache().set(key, blob)
+    instrumentation.count_cache(blob is not None)
+    return blob
+
+
+def _put(key, instance):
+    blob = pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+    cache.set(key, blob, settings.OBJECT_CACHE_TTL)
+    local_cache().set(key, blob)
+
+
+def _put_many(instances):
+    """Кладёт {ключ: объект} на оба уровня одним set_many."""
+    blobs = {
+        key: pickle.dumps(instance, pickle.HIGHEST_PROTOCOL)
+        for key, instance in instances.items()
+    }
+    cache.set_many(blobs, settings.OBJECT_CACHE_TTL)
+    for key, blob in blobs.items():
+        local_cache().set(key, blob)
+
+
+def _plain(instance):
+    """Копия объекта без подгруженных связанных объектов."""
+    names = [field.attname for field in instance._meta.concrete_fields]
+    return type(instance).from_db(
+        instance._state.db, names, [getattr(instance, name) for name in names]
+    )
+
+
+def _get(model, pk, load):
+    """Объект по id из L1, L2 или БД; None, если его нет."""
+    key = _key(model, pk)
+    blob = _fetch(key)
+    if blob is not None:
+        return pickle.loads(blob)
+    instance = load(pk=pk)
+    if instance is not None:
+        _put(key, instance)
+    return instance
+
+
+def _get_many(model, pks, load, plain=False):
+    """{id: объект}: сначала L1, затем один get_many к L2.
+
+    Промахи грузятся одним вызовом load(ids) -> {id: объект}; plain —
+    класть в кэш объекты без подгруженных связанных.
+    """
+    pks = list(dict.fromkeys(pks))
+    if not pks:
+        return {}
+    keys = dict(zip(pks, _keys(model, pks)))
+    blobs = {}
+    for pk, key in keys.items():
+        blob = local_cache().get(key)
+        if blob is not None:
+            blobs[pk] = blob
+    remote = {keys[pk]: pk for pk in pks if pk not in blobs}
+    if remote:
+        for key, blob in cache.get_many(list(remote)).items():
+            blobs[remote[key]] = blob
+            local_cache().set(key, blob)
+    found = {pk: pickle.loads(blob) for pk, blob in blobs.items()}
+    missing = [pk for pk in pks if pk not in found]
+    for pk in pks:
+        instrumentation.count_cache(pk in found)
+    instrumentation.count_batch(len(pks), len(missing))
+    if missing:
+        loaded = load(missing)
+        _put_many(
+            {
+                keys[pk]: _plain(instance) if plain else instance
+                for pk, instance in loaded.items()
+            }
+        )
+        found.update(loaded)
+    return found
+
+
+def _get_by(model, field, value, load):
+    """Объект по уникальному полю; Http404, если его нет."""
+    # Поколение модели в ключе: после пересчёта или очистки общего кэша
+    # старые соответствия в L1 других процессов не используются.
+    generation = feed_cache.generations([model_scope(model)])[0]
+    lookup_key = f"object:{_label(model)}:{generation}:{field}:{value}"
+    pk = local_cache().get(lookup_key) or cache.get(lookup_key)
+    if pk is not None:
+        instance = _get(model, pk, load)
+        # Поле могли переименовать: старое значение ведёт не туда.
+        if instance is not None and getattr(instance, field) == value:
+            return instance
+    instance = load(**{field: value})
+    if instance is None:
+        raise Http404(f"{model._meta.object_name} не найден.")
+    _put(_key(model, instance.pk), instance)
+    cache.set(lookup_key, instance.pk, settings.OBJECT_CACHE_TTL)
+    local_cache().set(lookup_key, instance.pk)
+    return instance
+
+
+def _load_group(**lookup):
+    return Group.objects.filter(**lookup).first()
+
+
+def _load_user(**lookup):
+    return User.objects.select_related("stats").filter(**lookup).first()
+
+
+def _load_groups(pks):
+    return Group.objects.in_bulk(pks)
+
+
+def _load_users(pks):
+    return User.objects.select_related("stats").in_bulk(pks)
+
+
+def _load_posts(pks):
+    posts = Post.objects.select_related("author__stats", "group").in_bulk(pks)
+    # Авторы и группы кэшируются отдельно: их меняют свои сигналы.
+    authors = {post.author_id: post.author for post in posts.values()}
+    groups = {
+        post.group_id: post.group
+        for post in posts.values()
+        if post.group_id is not None
+    }
+    _put_many(dict(zip(_keys(User, authors), authors.values())))
+    _put_many(dict(zip(_keys(Group, groups), groups.values())))
+    return posts
+
+
+def get_group(pk):
+    return _get(Group, pk, _load_group)
+
+
+def get_group_by_slug(slug):
+    return _get_by(Group, "slug", slug, _load_group)
+
+
+def get_user(pk):
+    return _get(User, pk, _load_user)
+
+
+def get_user_by_username(username):
+    return _get_by(User, "username", username, _load_user)
+
+
+def _attach_group(post, group):
+    # Удаление группы обнуляет group_id одним UPDATE, мимо сигналов
+    # поста: закэшированный пост может ссылаться на уже удалённую.
+    if group is None:
+        post.group_id = None
+    else:
+        post.group = group
+
+
+def get_post(pk):
+    """Пост с автором (и его счётчиками) и группой; Http404, если нет."""
+    key = _key(Post, pk)
+    blob = _fetch(key)
+    if blob is None:
+        post = next(iter(_load_posts([pk]).values()), None)
+        if post is None:
+            raise Http404("Пост не найден.")
+        _put(key, _plain(post))
+        return post
+    post = pickle.loads(blob)
+    post.author = get_user(post.author_id)
+    if post.group_id is not None:
+        _attach_group(post, get_group(post.group_id))
+    return post
+
+
+def get_posts(pks):
+    """Посты по списку id в том же порядке, с авторами и группами.
+
+    Всё найденное в кэше читается пачками, промахи — одним запросом
+    id__in; удалённые за это время посты пропускаются.
+    """
+    posts = _get_many(Post, pks, _load_posts, plain=True)
+    authors = _get_many(
+        User, [post.author_id for post in posts.values()], _load_users
+    )
+    groups = _get_many(
+        Group,
+        [post.group_id for post in posts.values() if post.group_id],
+        _load_groups,
+    )
+    result = []
+    for pk in pks:
+        post = posts.get(pk)
+        if post is None:
+            continue
+        post.author = authors[post.author_id]
+        if post.group_id is not None:
+            _attach_group(post, groups.get(post.group_id))
+        result.append(post)
+    return result
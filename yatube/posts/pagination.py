@@ -0,0 +1,361 @@
+import base64
+import collections.abc
+import json
+
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+FEED_ORDERING = ("-pub_date", "-id")
+# Поля строки страницы при сборке объектов через assemble; внешние ключи
+# нужны, чтобы менеджер связанных объектов не догружал их по одному.
+ROW_FIELDS = ("id", "pub_date", "author_id", "group_id")
+
+FORWARD = "n"
+BACKWARD = "p"
+LAST = "last"
+
+
+def encode_cursor(obj, direction=FORWARD, field="pub_date"):
+    """Кодирует позицию объекта в ленте в непрозрачный токен."""
+    payload = json.dumps(
+        [direction, getattr(obj, field).isoformat(), obj.pk],
+        separators=(",", ":"),
+    )
+    token = base64.urlsafe_b64encode(payload.encode())
+    return token.decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Возвращает (направление, pub_date, id) или None для битого токена."""
+    if token == LAST:
+        return LAST, None, None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, pub_date, pk = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode()
+        )
+        pub_date = parse_datetime(pub_date)
+    except (TypeError, ValueError, UnicodeError):
+        return None
+    if direction not in (FORWARD, BACKWARD) or pub_date is None:
+        return None
+    if not isinstance(pk, int):
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(collections.abc.Sequence):
+    """Страница ленты, полученная по курсору (pub_date, id)."""
+
+    is_cursor = True
+    number = None
+
+    def __init__(
+        self, object_list, paginator, has_next, has_previous, cursor=None
+    ):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return "<Cursor page %s>" % self.cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return encode_cursor(self.object_list[-1], FORWARD)
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(self.object_list[0], BACKWARD)
+        return None
+
+
+class CountedRows(collections.abc.Sequence):
+    """Строки OFFSET-страницы, выбираемые при первом обращении.
+
+    Пока страницу не читают (фрагмент ленты уже в кэше), запрос не
+    выполняется, а пагинатор верит внешнему числу объектов. Прочитанные
+    строки сверяются с ним — см. FeedPaginator._counted_rows.
+    """
+
+    def __init__(self, paginator, number):
+        self.paginator = paginator
+        self.number = number
+
+    @cached_property
+    def rows(self):
+        return self.paginator._counted_rows(self.number)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+
+class AssembledList(collections.abc.Sequence):
+    """Строки страницы, при первом обращении заменяемые полными объектами.
+
+    Страница выбирается лёгким запросом (id, pub_date); assemble(строки)
+    возвращает готовые объекты — например, из кэша. Если страницу не
+    читают (фрагмент ленты уже в кэше), не выполняется и запрос.
+    """
+
+    def __init__(self, rows, assemble):
+        self._rows = rows
+        self._assemble = assemble
+        self._objects = None
+
+    @property
+    def objects(self):
+        if self._objects is None:
+            self._objects = self._assemble(list(self._rows))
+        return self._objects
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, index):
+        return self.objects[index]
+
+
+class FeedPaginator(Paginator):
+    """Пагинатор ленты постов.
+
+    Первые ``offset_pages`` страниц отдаются обычным OFFSET/LIMIT,
+    дальше лента листается курсором по (pub_date, id): глубокая
+    страница стоит столько же, сколько первая, и не требует COUNT(*).
+    Если известно число объектов (``count`` — число или функция),
+    COUNT(*) выполняется, только когда страница ему противоречит.
+    Уже упорядоченные последовательности (например, выдача поиска)
+    листаются только по номеру страницы.
+    С ``assemble`` страница выбирается только по ROW_FIELDS, а объекты
+    собирает assemble(строки) — см. AssembledList.
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        offset_pages=None,
+        count=None,
+        assemble=None,
+        **kwargs,
+    ):
+        self.supports_cursor = hasattr(object_list, "order_by")
+        if self.supports_cursor:
+            object_list = object_list.order_by(*FEED_ORDERING)
+            if assemble is not None:
+                object_list = object_list.select_related(None).only(
+                    *ROW_FIELDS
+                )
+        else:
+            offset_pages = None
+            assemble = None
+        super().__init__(object_list, per_page, **kwargs)
+        self.offset_pages = offset_pages
+        self.assemble = assemble
+        self._known_count = count
+
+    def _assembled(self, rows):
+        if self.assemble is None:
+            return rows
+        return AssembledList(rows, self.assemble)
+
+    @cached_property
+    def count(self):
+        if self._known_count is None:
+            return super().count
+        return self.approximate_count
+
+    @property
+    def page_range(self):
+        num_pages = self.num_pages
+        if self.offset_pages is not None:
+            num_pages = min(num_pages, self.offset_pages)
+        return range(1, num_pages + 1)
+
+    def elided_page_range(self, number, on_each_side=3, on_ends=1):
+        """Номера страниц: края и окно вокруг текущей; None — пропуск.
+
+        Длина не зависит от числа страниц, поэтому и разметка пагинатора
+        на длинной ленте остаётся одного размера.
+        """
+        last = len(self.page_range)
+        shown = {
+            *range(1, on_ends + 1),
+            *range(number - on_each_side, number + on_each_side + 1),
+            *range(last - on_ends + 1, last + 1),
+        }
+        result = []
+        previous = 0
+        for page in sorted(page for page in shown if 1 <= page <= last):
+            if page - previous == 2:
+                # Пропуск в одну страницу короче показать номером.
+                result.append(previous + 1)
+            elif page - previous > 2:
+                result.append(None)
+            result.append(page)
+            previous = page
+        return result
+
+    @property
+    def has_deep_pages(self):
+        """Есть страницы за пределами OFFSET-пагинации."""
+        return (
+            self.offset_pages is not None
+            and self.num_pages > self.offset_pages
+        )
+
+    @property
+    def approximate_count(self):
+        """Число объектов из внешнего источника, без COUNT(*).
+
+        Функция вызывается один раз: шаблон читает число не однажды.
+        """
+        if callable(self._known_count):
+            self._known_count = self._known_count()
+        return self._known_count
+
+    def _set_count(self, count):
+        self.__dict__["count"] = count
+        self.__dict__.pop("num_pages", None)
+
+    def _exact_count(self):
+        """Отказывается от внешнего числа объектов в пользу COUNT(*)."""
+        self._known_count = None
+        self.__dict__.pop("count", None)
+        self.__dict__.pop("num_pages", None)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self._known_count is None:
+                raise
+            # Счётчик мог отстать от таблицы: номер сверяется с COUNT(*).
+            self._exact_count()
+            return super().validate_number(number)
+
+    def page(self, number):
+        """Страница; строки выбираются при первом чтении (CountedRows)."""
+        if self._known_count is None:
+            return super().page(number)
+        number = self.validate_number(number)
+        return self._get_page(CountedRows(self, number), number, self)
+
+    def _counted_rows(self, number):
+        """Строки страницы; внешнее число объектов сверяется с ними.
+
+        Счётчик мог отстать от таблицы (строки вставлены в обход
+        сигналов) или обогнать её. Неполная страница — последняя, и
+        число объектов по ней известно точно; полная страница за
+        пределами счётчика или пустая не первая — повод для COUNT(*).
+        """
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        rows = list(self.object_list[bottom:top])
+        fetched = bottom + len(rows)
+        if len(rows) < self.per_page and (rows or number == 1):
+            self._set_count(fetched)
+        elif fetched > self.count or not rows:
+            self._exact_count()
+        return rows
+
+    def _get_page(self, object_list, *args, **kwargs):
+        page = Page(self._assembled(object_list), *args, **kwargs)
+        page.is_cursor = False
+        page.next_cursor = None
+        if (
+            self.offset_pages is not None
+            and page.number >= self.offset_pages
+            and page.has_next()
+        ):
+            page.next_cursor = encode_cursor(page[len(page) - 1], FORWARD)
+        return page
+
+    def cursor_page(self, token):
+        """Страница по курсору; для битого токена — первая страница."""
+        cursor = decode_cursor(token or "")
+        if cursor is None or not self.supports_cursor:
+            return self.get_page(1)
+        direction, pub_date, pk = cursor
+        queryset = self.object_list
+        # (pub_date, id) < (x, y) записано так, чтобы первое условие
+        # давало поиск по диапазону индекса, а не сканирование с начала.
+        if direction == FORWARD:
+            queryset = queryset.filter(
+                Q(pub_date__lte=pub_date)
+                & (Q(pub_date__lt=pub_date) | Q(id__lt=pk))
+            )
+        else:
+            if direction == BACKWARD:
+                queryset = queryset.filter(
+                    Q(pub_date__gte=pub_date)
+                    & (Q(pub_date__gt=pub_date) | Q(id__gt=pk))
+                )
+            queryset = queryset.reverse()
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == FORWARD:
+            return CursorPage(
+                self._assembled(rows), self, has_more, True, token
+            )
+        rows.reverse()
+        return CursorPage(
+            self._assembled(rows),
+            self,
+            direction == BACKWARD,
+            has_more,
+            token,
+        )
+
+
+def keyset_slice(queryset, token, per_page, field, descending=False):
+    """Следующая порция по курсору (field, id) без OFFSET.
+
+    Возвращает (объекты, курсор следующей порции или None).
+    """
+    sign = "-" if descending else ""
+    queryset = queryset.order_by(f"{sign}{field}", f"{sign}id")
+    cursor = decode_cursor(token) if token else None
+    if cursor is not None and cursor[0] == FORWARD:
+        _, value, pk = cursor
+        if descending:
+            queryset = queryset.filter(
+                Q(**{f"{field}__lte": value})
+                & (Q(**{f"{field}__lt": value}) | Q(id__lt=pk))
+            )
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__gte": value})
+                & (Q(**{f"{field}__gt": value}) | Q(id__gt=pk))
+            )
+    rows = list(queryset[: per_page + 1])
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor(rows[-1], FORWARD, field)
@@ -0,0 +1,189 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite со сборкой FTS5 поиск идёт по виртуальной таблице
+posts_post_fts, иначе — по инвертированному индексу SearchPosting,
+который строится и ранжируется (TF-IDF) на Python.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import Post, SearchPosting
+
+FTS_TABLE = "posts_post_fts"
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text or "")]
+
+
+# Базы, где таблица FTS5 уже найдена: таблица не пропадает, а чтение
+# sqlite_master на каждое сохранение поста — лишний запрос.
+_fts5_databases = set()
+
+
+def fts5_available():
+    if connection.vendor != "sqlite":
+        return False
+    name = connection.settings_dict["NAME"]
+    if name in _fts5_databases:
+        return True
+    if FTS_TABLE not in connection.introspection.table_names():
+        return False
+    _fts5_databases.add(name)
+    return True
+
+
+class FTS5Backend:
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk]
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, group_id, author_id)"
+                " VALUES (%s, %s, %s, %s)",
+                [post.pk, post.text, post.group_id, post.author_id],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, text, group_id, author_id)"
+                " SELECT id, text, group_id, author_id FROM posts_post"
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+            )
+            cursor.execute(f"SELECT count(*) FROM {FTS_TABLE}")
+            return cursor.fetchone()[0]
+
+    def search(self, terms, group_id=None, author_id=None, limit=None):
+        # Каждый термин в кавычках: пользовательский ввод не может
+        # сломать синтаксис MATCH.
+        match = " ".join('"%s"' % term for term in terms)
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        params = [match]
+        if group_id is not None:
+            sql += " AND group_id = %s"
+            params.append(group_id)
+        if author_id is not None:
+            sql += " AND author_id = %s"
+            params.append(author_id)
+        sql += " ORDER BY rank, rowid DESC LIMIT %s"
+        params.append(limit or -1)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PythonBackend:
+    def index(self, post):
+        SearchPosting.objects.filter(post_id=post.pk).delete()
+        SearchPosting.objects.bulk_create(
+            SearchPosting(post_id=post.pk, term=term[:64], frequency=count)
+            for term, count in Counter(tokenize(post.text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchPosting.objects.filter(post_id=post_id).delete()
+
+    def rebuild(self):
+        SearchPosting.objects.all().delete()
+        total = 0
+        for post in Post.objects.only("pk", "text").iterator():
+            self.index(post)
+            total += 1
+        return total
+
+    def search(self, terms, group_id=None, author_id=None, limit=None):
+        terms = {term[:64] for term in terms}
+        postings = SearchPosting.objects.filter(term__in=terms)
+        documents = Post.objects.count() or 1
+        idf = {
+            row["term"]: math.log(1 + documents / row["df"])
+            for row in postings.values("term").annotate(df=Count("id"))
+        }
+        if group_id is not None:
+            postings = postings.filter(post__group_id=group_id)
+        if author_id is not None:
+            postings = postings.filter(post__author_id=author_id)
+        scores = defaultdict(float)
+        matched = Counter()
+        rows = postings.values_list("post_id", "term", "frequency")
+        for post_id, term, frequency in rows.iterator():
+            scores[post_id] += (1 + math.log(frequency)) * idf[term]
+            matched[post_id] += 1
+        ranked = sorted(
+            (pk for pk in scores if matched[pk] == len(terms)),
+            key=lambda pk: (-scores[pk], -pk),
+        )
+        return ranked[:limit] if limit else ranked
+
+
+def get_backend():
+    name = settings.POSTS_SEARCH_BACKEND
+    if name == "fts5" or (name == "auto" and fts5_available()):
+        return FTS5Backend()
+    return PythonBackend()
+
+
+def index_post(post):
+    get_backend().index(post)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
+
+
+def rebuild():
+    return get_backend().rebuild()
+
+
+def search_ids(query, group=None, author=None):
+    """id постов по запросу, от самых релевантных."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    return get_backend().search(
+        terms,
+        group_id=group.pk if group else None,
+        author_id=author.pk if author else None,
+        limit=settings.POSTS_SEARCH_MAX_RESULTS,
+    )
+
+
+class SearchResults:
+    """Ранжированная выдача для пагинатора: посты грузятся постранично."""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search(query, group=None, author=None):
+    return SearchResults(search_ids(query, group, author))
@@ -0,0 +1,215 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import jobs
+
+from . import (
+    counters,
+    feed_cache,
+    notifications,
+    object_cache,
+    search,
+    timeline,
+)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_owner(sender, instance, raw=False, **kwargs):
+    """Запоминает прежних автора и группу поста перед изменением."""
+    instance._previous_owner = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_owner = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("author_id", "group_id")
+        .first()
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    owner = getattr(instance, "_previous_owner", None)
+    if not created and owner is None:
+        return
+    if created:
+        counters.shift_count("posts", 1)
+    old_author_id, old_group_id = owner or (None, None)
+    if instance.author_id != old_author_id:
+        if old_author_id is not None:
+            counters.shift_user(old_author_id, posts_count=-1)
+        counters.shift_user(instance.author_id, posts_count=1)
+    if instance.group_id != old_group_id:
+        counters.shift_group(old_group_id, -1)
+        counters.shift_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.shift_count("posts", -1)
+    counters.shift_user(instance.author_id, posts_count=-1)
+    counters.shift_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.shift_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.shift_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.shift_user(instance.author_id, followers_count=1)
+        counters.shift_user(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.shift_user(instance.author_id, followers_count=-1)
+    counters.shift_user(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def notify_followers(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        jobs.enqueue(notifications.NOTIFY_TASK, post_id=instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, raw=False, **kwargs):
+    scopes = feed_cache.post_scopes(
+        instance.author_id, instance.group_id, instance.pk
+    )
+    owner = getattr(instance, "_previous_owner", None)
+    if owner is not None:
+        scopes.extend(feed_cache.post_scopes(*owner))
+    feed_cache.bump(*set(scopes))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    feed_cache.bump(
+        *feed_cache.post_scopes(
+            instance.author_id, instance.group_id, instance.pk
+        )
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_group_posts(sender, instance, **kwargs):
+    # SET_NULL обнуляет group_id постов одним UPDATE, без их сигналов.
+    object_cache.invalidate_model(Post)
+
+
+# Поля пользователя, видимые на страницах: имя в карточках,
+# комментариях и лентах, username в ссылках на профиль.
+USER_DISPLAY_FIELDS = ("username", "first_name", "last_name")
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    """Запоминает прежние имена пользователя перед изменением."""
+    instance._previous_names = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    # Вход обновляет только last_login: лишний запрос ни к чему.
+    if update_fields is not None and not (
+        set(update_fields) & set(USER_DISPLAY_FIELDS)
+    ):
+        return
+    instance._previous_names = (
+        User.objects.filter(pk=instance.pk)
+        .values_list(*USER_DISPLAY_FIELDS)
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_user(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, "_previous_names", None)
+    current = tuple(getattr(instance, name) for name in USER_DISPLAY_FIELDS)
+    if previous is None or previous == current:
+        return
+    # Имя автора есть на любой странице с его постами и комментариями.
+    feed_cache.bump(
+        feed_cache.site_scope(), feed_cache.author_scope(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    # Ссылки на группу есть в ленте любой страницы с её постами.
+    feed_cache.bump(
+        feed_cache.site_scope(), feed_cache.group_scope(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.viewer_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_object(sender, instance, **kwargs):
+    object_cache.invalidate(sender, instance.pk)
+
+
+@receiver(post_save, sender=UserStats)
+def invalidate_cached_user(sender, instance, **kwargs):
+    object_cache.invalidate(User, instance.user_id)
@@ -0,0 +1,251 @@
+"""Ленты RSS, Atom и JSON Feed: общая, группы и автора.
+
+Записи берутся тем же запросом, что и HTML-ленты (for_feed), и пишутся
+в ответ потоком по одной: большая лента не собирается в памяти целиком.
+Валидаторы — из posts.conditional (не зависят от читателя), готовое
+тело ленты кэшируется под ETag, пока не сдвинется поколение её области.
+"""
+import hashlib
+import io
+import json
+from itertools import chain, islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.text import Truncator
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from core import instrumentation
+
+from .conditional import (
+    conditional,
+    get_author,
+    get_group,
+    group_scopes,
+    index_scopes,
+    profile_scopes,
+)
+from .models import Post
+
+FEED_KEY = "syndication:%s"
+TITLE_LENGTH = 60
+
+
+class StreamingFeed:
+    """Пишет ленту по кусочку на запись вместо write() целиком."""
+
+    content_type = None
+    item_tag = None
+
+    def open_root(self, handler):
+        raise NotImplementedError
+
+    def close_root(self, handler):
+        raise NotImplementedError
+
+    def item(self, kwargs):
+        """Запись в том виде, в каком её хранит add_item."""
+        self.add_item(**kwargs)
+        return self.items.pop()
+
+    def stream(self, entries):
+        entries = iter(entries)
+        # Дата обновления в заголовке ленты берётся из самой свежей записи.
+        self.items = [self.item(kwargs) for kwargs in islice(entries, 1)]
+        buffer = io.StringIO()
+        handler = SimplerXMLGenerator(buffer, "utf-8")
+        handler.startDocument()
+        self.open_root(handler)
+        self.add_root_elements(handler)
+        yield _drain(buffer)
+        for item in chain(self.items, map(self.item, entries)):
+            handler.startElement(self.item_tag, self.item_attributes(item))
+            self.add_item_elements(handler, item)
+            handler.endElement(self.item_tag)
+            yield _drain(buffer)
+        self.close_root(handler)
+        yield _drain(buffer)
+
+
+class RssFeed(StreamingFeed, feedgenerator.Rss201rev2Feed):
+    content_type = "application/rss+xml; charset=utf-8"
+    item_tag = "item"
+
+    def open_root(self, handler):
+        handler.startElement("rss", self.rss_attributes())
+        handler.startElement("channel", self.root_attributes())
+
+    def close_root(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement("rss")
+
+
+class AtomFeed(StreamingFeed, feedgenerator.Atom1Feed):
+    content_type = "application/atom+xml; charset=utf-8"
+    item_tag = "entry"
+
+    def open_root(self, handler):
+        handler.startElement("feed", self.root_attributes())
+
+    def close_root(self, handler):
+        handler.endElement("feed")
+
+
+class JsonFeed(StreamingFeed, feedgenerator.SyndicationFeed):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)."""
+
+    content_type = "application/feed+json; charset=utf-8"
+
+    def stream(self, entries):
+        head = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": self.feed["title"],
+            "home_page_url": self.feed["link"],
+            "feed_url": self.feed["feed_url"],
+            "description": self.feed["description"],
+            "language": self.feed["language"],
+        }
+        yield _json(head)[:-1].encode() + b', "items": ['
+        for number, kwargs in enumerate(entries):
+            item = self.item(kwargs)
+            entry = {
+                "id": item["unique_id"],
+                "url": item["link"],
+                "title": item["title"],
+                "content_text": item["description"],
+                "date_published": item["pubdate"].isoformat(),
+                "authors": [{"name": item["author_name"]}],
+                "tags": item["categories"],
+            }
+            yield (", " if number else "").encode() + _json(entry).encode()
+        yield b"]}"
+
+
+FORMATS = {"rss": RssFeed, "atom": AtomFeed, "json": JsonFeed}
+
+
+def _drain(buffer):
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk.encode()
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get("limit", settings.FEED_ITEMS))
+    except ValueError:
+        return settings.FEED_ITEMS
+    return min(max(limit, 1), settings.FEED_MAX_ITEMS)
+
+
+def _entries(request, posts):
+    for post in posts:
+        link = request.build_absolute_uri(
+            reverse("posts:post_detail", args=[post.pk])
+        )
+        yield {
+            "title": Truncator(post.text).chars(TITLE_LENGTH),
+            "link": link,
+            "description": post.text,
+            "author_name": post.author.get_full_name()
+            or post.author.username,
+            "pubdate": post.pub_date,
+            "unique_id": link,
+            "categories": [post.group.title] if post.group_id else [],
+        }
+
+
+def _cache_body(chunks, key):
+    """Отдаёт куски дальше и кэширует тело, если оно не слишком велико."""
+    body = []
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size <= settings.FEED_CACHE_MAX_SIZE:
+            body.append(chunk)
+        yield chunk
+    if size <= settings.FEED_CACHE_MAX_SIZE:
+        cache.set(key, b"".join(body), settings.SYNDICATION_CACHE_TTL)
+
+
+def _feed(request, fmt, queryset, title, page_url, description):
+    feed_class = FORMATS.get(fmt)
+    if feed_class is None:
+        raise Http404("Неизвестный формат ленты.")
+    etag = request._posts_validators[0]
+    key = FEED_KEY % hashlib.md5(
+        (request.get_host() + etag).encode()
+    ).hexdigest()
+    body = cache.get(key)
+    instrumentation.count_cache(body is not None)
+    if body is not None:
+        return HttpResponse(body, content_type=feed_class.content_type)
+    feed = feed_class(
+        title=title,
+        link=request.build_absolute_uri(page_url),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        language=settings.LANGUAGE_CODE,
+    )
+    posts = queryset.order_by("-pub_date", "-id")[: _limit(request)]
+    chunks = feed.stream(_entries(request, posts.iterator()))
+    return StreamingHttpResponse(
+        _cache_body(chunks, key), content_type=feed_class.content_type
+    )
+
+
+def _without_format(scopes_func):
+    def scopes(request, fmt, **kwargs):
+        return scopes_func(request, **kwargs)
+
+    return scopes
+
+
+@conditional(_without_format(index_scopes), personal=False)
+def index_feed(request, fmt):
+    """Лента последних записей сайта."""
+    return _feed(
+        request,
+        fmt,
+        Post.objects.for_feed(),
+        "Yatube: последние записи",
+        reverse("posts:index"),
+        "Последние обновления на сайте",
+    )
+
+
+@conditional(_without_format(group_scopes), personal=False)
+def group_feed(request, fmt, slug):
+    """Лента записей сообщества."""
+    group = get_group(request, slug)
+    return _feed(
+        request,
+        fmt,
+        group.posts.for_feed(),
+        f"Yatube: {group.title}",
+        reverse("posts:group_list", args=[slug]),
+        group.description or f"Записи сообщества {group.title}",
+    )
+
+
+@conditional(_without_format(profile_scopes), personal=False)
+def profile_feed(request, fmt, username):
+    """Лента записей автора."""
+    author = get_author(request, username)
+    name = author.get_full_name() or author.username
+    return _feed(
+        request,
+        fmt,
+        author.posts.for_feed(),
+        f"Yatube: {name}",
+        reverse("posts:profile", args=[username]),
+        f"Записи пользователя {name}",
+    )
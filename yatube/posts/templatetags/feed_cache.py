@@ -0,0 +1,48 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, fragment):
+        self.nodelist = nodelist
+        self.fragment = fragment
+
+    def render(self, context):
+        fragment = self.fragment.resolve(context)
+        if fragment is None:
+            return self.nodelist.render(context)
+        value = fragment.get()
+        if value is None:
+            value = self.nodelist.render(context)
+            fragment.set(value)
+        return value
+
+
+@register.tag("feedcache")
+def do_feedcache(parser, token):
+    """{% feedcache fragment %}...{% endfeedcache %}
+
+    fragment — объект posts.feed_cache.FeedFragment из контекста.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            "'%s' принимает один аргумент" % bits[0]
+        )
+    nodelist = parser.parse(("endfeedcache",))
+    parser.delete_first_token()
+    return FeedCacheNode(nodelist, parser.compile_filter(bits[1]))
+
+
+@register.simple_tag
+def postcards(posts):
+    """{% postcards page_obj %} — карточки постов страницы в post.card.
+
+    Ставится внутри {% feedcache %}: при попадании фрагмента карточки
+    не нужны вовсе.
+    """
+    cards.attach(posts)
+    return ""
@@ -0,0 +1,146 @@
+import gzip
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f"Пост {i}")
+            for i in range(13)
+        )
+        cls.post = Post.objects.latest("pub_date", "id")
+
+    def setUp(self):
+        self.client_auth = Client()
+        self.client_auth.force_login(self.reader)
+
+    def test_feed_cursor(self):
+        """Лента листается курсором до конца без повторов."""
+        url = reverse("api:group_posts", args=[self.group.slug])
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            seen += [post["id"] for post in data["results"]]
+            url = data["next"]
+        self.assertEqual(len(seen), 13)
+        self.assertEqual(len(set(seen)), 13)
+        self.assertEqual(seen[0], self.post.id)
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только запрошенные поля."""
+        response = self.client.get(
+            reverse("api:posts"), {"fields": "id,text,unknown"}
+        )
+        self.assertEqual(
+            set(response.json()["results"][0]), {"id", "text"}
+        )
+
+    def test_etag_and_gzip(self):
+        """Повторный GET с ETag даёт 304, ответ сжимается gzip."""
+        url = reverse("api:posts")
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip.decompress(response.content).decode().count('"id"'), 10
+        )
+        response = self.client.get(
+            url,
+            HTTP_ACCEPT_ENCODING="gzip",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+        url = reverse("api:post_detail", args=[self.post.id])
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_validation(self):
+        """Комментарий проверяется той же формой, аноним получает 401."""
+        url = reverse("api:comments", args=[self.post.id])
+        self.assertEqual(self.client.post(url, {"text": "x"}).status_code, 401)
+        response = self.client_auth.post(url, {"text": ""})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("text", response.json()["errors"])
+        response = self.client_auth.post(url, {"text": "Комментарий"})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Comment.objects.filter(text="Комментарий").exists())
+        results = self.client.get(url).json()["results"]
+        self.assertEqual(results[0]["author"], "reader")
+
+    def test_json_body(self):
+        """Запись принимает JSON-тело; битый JSON — 400 в JSON."""
+        url = reverse("api:comments", args=[self.post.id])
+        response = self.client_auth.post(
+            url, {"text": "Из JSON"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["text"], "Из JSON")
+        response = self.client_auth.post(
+            reverse("api:posts"),
+            {"text": "Пост из JSON"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Post.objects.filter(text="Пост из JSON").exists())
+        for body in ("{text", "[]"):
+            with self.subTest(body=body):
+                response = self.client_auth.post(
+                    url, body, content_type="application/json"
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("detail", response.json())
+
+    def test_follow(self):
+        """Подписка и отписка, лента подписок."""
+        url = reverse("api:follow", args=[self.author.username])
+        self.assertEqual(self.client_auth.post(url).status_code, 201)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        data = self.client_auth.get(reverse("api:follow_posts")).json()
+        self.assertEqual(len(data["results"]), 10)
+        self.assertEqual(self.client_auth.delete(url).status_code, 200)
+        self.assertFalse(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        self.assertEqual(
+            self.client.get(reverse("api:follow_posts")).status_code, 401
+        )
+
+    def test_csrf_flow(self):
+        """Запись требует токен из /csrf/; без него — 403 в JSON."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        url = reverse("api:follow", args=[self.author.username])
+        response = client.post(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertIn("CSRF", response.json()["detail"])
+        token = client.get(reverse("api:csrf")).json()["csrf_token"]
+        response = client.post(url, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 201)
+        response = client.delete(url, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json(), {"following": False})
+
+    def test_errors_in_json(self):
+        """Несуществующие пост и автор дают 404 в JSON."""
+        urls = (
+            reverse("api:post_detail", args=[0]),
+            reverse("api:profile_posts", args=["ghost"]),
+            reverse("api:group_posts", args=["ghost"]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {"detail": "Не найдено."})
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from posts import benchmark
+from posts.models import Comment, Follow, Post
+
+
+@override_settings(POST_THUMBNAIL_ASYNC=False)
+class BenchmarkTests(TestCase):
+    def test_seed_and_run(self):
+        """Засеянная база проходит все сценарии, метрики заполнены."""
+        benchmark.seed(users=5, groups=2, posts=30, comments=20, follows=10)
+        self.assertEqual(Post.objects.count(), 30)
+        results = benchmark.run(requests=3, warmup=1)
+        self.assertEqual(set(results), set(benchmark.SCENARIOS))
+        for metrics in results.values():
+            self.assertEqual(metrics["requests"], 3)
+            self.assertGreater(metrics["queries_max"], 0)
+            self.assertLessEqual(metrics["p50_ms"], metrics["p99_ms"])
+
+    def test_cold_run_keeps_site_cache(self):
+        """--cold чистит только кэш замеров, а не кэш сайта."""
+        benchmark.seed(users=3, groups=1, posts=5, comments=2, follows=2)
+        cache.set("benchmark-test", "kept")
+        benchmark.run(scenarios=["index"], requests=2, warmup=1, cold=True)
+        self.assertEqual(cache.get("benchmark-test"), "kept")
+
+    def test_seed_more_than_sqlite_batch(self):
+        """Больше 500 строк за раз не упираются в лимит SQLite."""
+        benchmark.seed(
+            users=60, groups=2, posts=600, comments=600, follows=700
+        )
+        self.assertEqual(Post.objects.count(), 600)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertGreater(Follow.objects.count(), 500)
+
+    def test_compare(self):
+        """Рост задержек сверх допуска и лишние запросы — регрессия."""
+        baseline = {"index": {"p50_ms": 10, "p90_ms": 20, "queries_max": 2}}
+        same = {"index": {"p50_ms": 11, "p90_ms": 21, "queries_max": 2}}
+        slower = {"index": {"p50_ms": 13, "p90_ms": 21, "queries_max": 3}}
+        self.assertEqual(benchmark.compare(same, baseline, 0.2), [])
+        self.assertEqual(len(benchmark.compare(slower, baseline, 0.2)), 2)
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BulkCommandsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.author = User.objects.create_user(username="author")
+        self.reader = User.objects.create_user(username="reader")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def run_command(self, *args, **options):
+        call_command(*args, stdout=StringIO(), **options)
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка обратно сохраняют данные и даты."""
+        group = Group.objects.create(title="Группа", slug="group")
+        post = Post.objects.create(
+            author=self.author, group=group, text="Пост"
+        )
+        old = timezone.now() - timedelta(days=30)
+        Post.objects.filter(pk=post.pk).update(pub_date=old)
+        Comment.objects.create(post=post, author=self.reader, text="Ответ")
+        Follow.objects.create(user=self.reader, author=self.author)
+        files = {
+            "groups": self.path("groups.csv"),
+            "posts": self.path("posts.jsonl"),
+            "comments": self.path("comments.csv"),
+            "follows": self.path("follows.jsonl"),
+        }
+        for kind, path in files.items():
+            self.run_command(f"export_{kind}", path)
+        for model in (Group, Post, Follow):
+            model.objects.all().delete()
+        for kind, path in files.items():
+            self.run_command(f"import_{kind}", path, batch_size=1)
+
+        post = Post.objects.select_related("group").get()
+        self.assertEqual(post.group.slug, "group")
+        self.assertEqual(post.pub_date, old)
+        self.assertEqual(post.comments.get().text, "Ответ")
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.group.posts_count, 1)
+        self.assertTrue(
+            Follow.objects.filter(user=self.reader, author=self.author)
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+
+    def test_unknown_references_skipped(self):
+        """Строки с неизвестным автором пропускаются, картинки копируются."""
+        image_name = "cat.gif"
+        with open(self.path(image_name), "wb") as image:
+            image.write(b"GIF89a")
+        with open(self.path("posts.jsonl"), "w") as file:
+            for username in ("author", "ghost"):
+                row = {"author": username, "text": "Пост", "image": "cat.gif"}
+                file.write(json.dumps(row) + "\n")
+        out = StringIO()
+        call_command(
+            "import_posts",
+            self.path("posts.jsonl"),
+            images_dir=self.directory,
+            stdout=out,
+        )
+        self.assertIn("пропущено: 1", out.getvalue())
+        post = Post.objects.get()
+        self.assertEqual(post.author, self.author)
+        self.assertTrue(post.image.name.startswith("posts/cat"))
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_duplicates_not_counted(self):
+        """Строки, уже бывшие в базе, не считаются загруженными."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with open(self.path("follows.jsonl"), "w") as file:
+            for user, author in (("reader", "author"), ("author", "reader")):
+                row = {"user": user, "author": author}
+                file.write(json.dumps(row) + "\n")
+        out = StringIO()
+        call_command("import_follows", self.path("follows.jsonl"), stdout=out)
+        self.assertIn("Загружено строк: 1,", out.getvalue())
+        self.assertIn("уже были в базе: 1", out.getvalue())
+
+    @override_settings(PAGE_CACHE=False)
+    def test_import_invalidates_cached_pages(self):
+        """После загрузки закэшированные страницы лент обновляются."""
+        cache.clear()
+        group = Group.objects.create(title="Группа", slug="group")
+        url = reverse("posts:group_list", args=[group.slug])
+        self.assertNotContains(Client().get(url), "Загруженный пост")
+        with open(self.path("posts.jsonl"), "w") as file:
+            row = {"author": "author", "group": "group"}
+            row["text"] = "Загруженный пост"
+            file.write(json.dumps(row) + "\n")
+        self.run_command("import_posts", self.path("posts.jsonl"))
+        self.assertContains(Client().get(url), "Загруженный пост")
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE=False)
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {number}"
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        return list(Post.objects.for_feed())
+
+    def test_rendered_once(self):
+        """Повторная выборка карточек — один get_many без рендера."""
+        self.assertEqual(cards.attach(self.feed()), 3)
+        posts = self.feed()
+        with mock.patch("posts.cards.render_to_string") as render:
+            self.assertEqual(cards.attach(posts), 0)
+        render.assert_not_called()
+        self.assertIn("Лев Толстой", posts[0].card)
+
+    def test_shared_between_feeds(self):
+        """Карточки главной страницы переиспользует лента группы."""
+        self.client.get(reverse("posts:index"))
+        self.assertEqual(cards.attach(self.group.posts.for_feed()), 0)
+
+    def test_invalidated_on_edit(self):
+        """Правка поста в post_edit перерисовывает только его карточку."""
+        post = Post.objects.latest("pk")
+        self.client.force_login(self.author)
+        cards.attach(self.feed())
+        self.client.post(
+            reverse("posts:post_edit", args=[post.pk]),
+            {"text": "Исправлено", "group": self.group.pk},
+        )
+        posts = self.feed()
+        self.assertEqual(cards.attach(posts), 1)
+        self.assertIn("Исправлено", posts[0].card)
+        response = self.client.get(
+            reverse("posts:group_list", args=["group"])
+        )
+        self.assertContains(response, "Исправлено")
+
+    def test_template_version(self):
+        """Новая версия шаблона карточки даёт новые ключи."""
+        cards.attach(self.feed())
+        with mock.patch("posts.cards.template_version", return_value="new"):
+            self.assertEqual(cards.attach(self.feed()), 3)
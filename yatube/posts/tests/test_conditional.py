@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalResponseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Пост"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, url, client=None):
+        client = client or self.client
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_not_modified(self):
+        """Неизменившиеся страницы отдают 304 без рендера шаблонов."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_last_modified(self):
+        """If-Modified-Since с отметкой страницы даёт 304."""
+        url = reverse("posts:index")
+        response = self.client.get(url)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate(self):
+        """Новый пост и комментарий меняют ETag затронутых страниц."""
+        detail = reverse("posts:post_detail", args=[self.post.id])
+        group = reverse("posts:group_list", args=[self.group.slug])
+        etags = {url: self.client.get(url)["ETag"] for url in (detail, group)}
+        Comment.objects.create(post=self.post, author=self.author, text="К")
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=etags[detail])
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(group, HTTP_IF_NONE_MATCH=etags[group])
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, group=self.group, text="Н")
+        response = self.client.get(group, HTTP_IF_NONE_MATCH=etags[group])
+        self.assertEqual(response.status_code, 200)
+
+    def test_authenticated_vary(self):
+        """Страницы зависят от сессии: свой ETag и private-кэш."""
+        client = Client()
+        client.force_login(self.author)
+        url = reverse("posts:index")
+        anonymous = self.client.get(url)
+        response = client.get(url)
+        self.assertNotEqual(response["ETag"], anonymous["ETag"])
+        self.assertIn("Cookie", response["Vary"])
+        self.assertIn("private", response["Cache-Control"])
+        self.assertEqual(self.revalidate(url, client).status_code, 304)
+
+    def test_author_rename_invalidates(self):
+        """Новое имя автора меняет ETag страниц с его постами."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:post_detail", args=[self.post.id]),
+        )
+        etags = {url: self.client.get(url)["ETag"] for url in urls}
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = "Переименованный"
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertContains(response, "Переименованный")
+
+    def test_new_login_invalidates(self):
+        """После повторного входа страница с формой отдаётся заново."""
+        User.objects.filter(pk=self.author.pk).update(
+            password=make_password("pass")
+        )
+        credentials = {"username": "author", "password": "pass"}
+        client = Client()
+        client.post(reverse("users:login"), credentials)
+        url = reverse("posts:post_detail", args=[self.post.id])
+        etag = client.get(url)["ETag"]
+        client.get(reverse("users:logout"))
+        client.post(reverse("users:login"), credentials)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_object(self):
+        """Для несуществующих страниц валидаторов нет."""
+        response = self.client.get(reverse("posts:profile", args=["nobody"]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("ETag"))
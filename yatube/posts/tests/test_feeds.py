@@ -0,0 +1,97 @@
+import json
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+class SyndicationFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author", first_name="Лев", last_name="Толстой"
+        )
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.other = Group.objects.create(title="Другая", slug="other")
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {number}"
+            )
+        Post.objects.create(author=cls.author, group=cls.other, text="Чужой")
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_rss(self):
+        """RSS группы — только её записи, свежие первыми, потоком."""
+        response = self.client.get(
+            reverse("posts:group_feed", args=["group", "rss"])
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response["Content-Type"], "application/rss+xml; charset=utf-8"
+        )
+        channel = ElementTree.fromstring(self.feed(response)).find("channel")
+        titles = [item.findtext("title") for item in channel.iter("item")]
+        self.assertEqual(titles, ["Пост 2", "Пост 1", "Пост 0"])
+
+    def test_atom(self):
+        """Atom автора содержит все его записи с именем автора."""
+        response = self.client.get(
+            reverse("posts:profile_feed", args=["author", "atom"])
+        )
+        root = ElementTree.fromstring(self.feed(response))
+        entries = root.findall(f"{ATOM}entry")
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(
+            entries[0].findtext(f"{ATOM}author/{ATOM}name"), "Лев Толстой"
+        )
+
+    def test_json(self):
+        """JSON Feed общей ленты с ограничением ?limit=."""
+        response = self.client.get(
+            reverse("posts:index_feed", args=["json"]), {"limit": 2}
+        )
+        data = json.loads(self.feed(response))
+        self.assertEqual(data["version"], "https://jsonfeed.org/version/1.1")
+        self.assertEqual(
+            [item["title"] for item in data["items"]], ["Чужой", "Пост 2"]
+        )
+        self.assertEqual(data["items"][0]["tags"], ["Другая"])
+
+    def test_unknown(self):
+        """Неизвестный формат и несуществующая группа — 404."""
+        for url in (
+            reverse("posts:index_feed", args=["yaml"]),
+            reverse("posts:group_feed", args=["missing", "rss"]),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(PAGE_CACHE=False)
+    def test_cached_until_changed(self):
+        """Повторный запрос из кэша, новый пост группы его сбрасывает."""
+        url = reverse("posts:group_feed", args=["group", "rss"])
+        first = self.client.get(url)
+        body = self.feed(first)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertFalse(second.streaming)
+        self.assertEqual(second.content, body)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, group=self.group, text="Новый")
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertIn("Новый", self.feed(response).decode())
@@ -1,13 +1,17 @@
 import shutil
 import tempfile
 import urllib.parse
+from importlib import import_module
 
+from django.apps import apps
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core import jobs
+from core.models import Job
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -134,6 +138,62 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(author_1.username, "HasNoName")
         self.assertEqual(group_1.title, "Заголовок тестовой группы")
 
+    def test_thumbnail_placeholder_until_ready(self):
+        """Пока миниатюра не готова, на странице поста стоит заглушка"""
+        form_data = {"text": "Пост с картинкой", "image": self.get_image()}
+        self.authorized_client.post(
+            reverse("posts:post_create"), data=form_data
+        )
+        post = Post.objects.get()
+        self.assertEqual(post.thumbnails, "")
+        response = self.authorized_client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.id})
+        )
+        self.assertContains(response, "thumbnail-placeholder.svg")
+
+    @override_settings(POST_THUMBNAIL_ASYNC=False)
+    def test_thumbnail_generated_on_save(self):
+        """Миниатюра готовится при сохранении формы"""
+        form_data = {"text": "Пост с картинкой", "image": self.get_image()}
+        self.authorized_client.post(
+            reverse("posts:post_create"), data=form_data
+        )
+        post = Post.objects.get()
+        url = post.thumbnail_urls["card"]
+        response = self.authorized_client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.id})
+        )
+        self.assertContains(response, url)
+        self.assertNotContains(response, "thumbnail-placeholder.svg")
+
+    def test_thumbnails_queued_by_migration(self):
+        """Миграция 0020 ставит в очередь миниатюры старых картинок"""
+        post = Post.objects.create(
+            author=self.user, text="Старый пост", image=self.get_image()
+        )
+        migration = import_module("posts.migrations.0020_queue_thumbnails")
+        migration.queue_thumbnails(apps, None)
+        self.assertTrue(
+            Job.objects.filter(task="posts.thumbnails.generate").exists()
+        )
+        jobs.work()
+        post.refresh_from_db()
+        self.assertIn("card", post.thumbnail_urls)
+
+    @staticmethod
+    def get_image():
+        small_gif = (
+            b"\x47\x49\x46\x38\x39\x61\x02\x00"
+            b"\x01\x00\x80\x00\x00\x00\x00\x00"
+            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+            b"\x0A\x00\x3B"
+        )
+        return SimpleUploadedFile(
+            name="small.gif", content=small_gif, content_type="image/gif"
+        )
+
 
 class CommentCreateFormTests(TestCase):
     @classmethod
@@ -1,7 +1,12 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import Client, TestCase
 
-from posts.models import Comment, Group, Post
+from posts.models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -146,3 +151,81 @@ class CommentModelTest(TestCase):
                 self.assertEqual(
                     comment._meta.get_field(field).help_text, expected_value
                 )
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="TestAuthor")
+        self.reader = User.objects.create_user(username="TestReader")
+        self.group = Group.objects.create(title="Группа", slug="group")
+        self.other_group = Group.objects.create(title="Другая", slug="other")
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за постами."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text="Пост"
+        )
+        self.assertCounters(self.author.stats, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=1)
+        post.delete()
+        self.assertCounters(self.author.stats, posts_count=0)
+        self.assertCounters(self.other_group, posts_count=0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок следуют за записями."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text="Комментарий"
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters(post, comments_count=1)
+        self.assertCounters(self.author.stats, followers_count=1)
+        self.assertCounters(self.reader.stats, following_count=1)
+        comment.delete()
+        follow.delete()
+        self.assertCounters(post, comments_count=0)
+        self.assertCounters(self.author.stats, followers_count=0)
+        self.assertCounters(self.reader.stats, following_count=0)
+
+    def test_recount_counters_command(self):
+        """Команда recount_counters восстанавливает счётчики."""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f"Пост {i}")
+            for i in range(3)
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+        call_command("recount_counters", stdout=StringIO())
+        self.assertCounters(self.group, posts_count=3)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 3
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+
+    def test_backfill_migration(self):
+        """Миграция 0019 заполняет счётчики по существующим строкам."""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=f"Пост {i}")
+            for i in range(3)
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+        UserStats.objects.all().delete()
+        migration = import_module("posts.migrations.0019_backfill_counters")
+        migration.backfill_counters(apps, None)
+        self.assertCounters(self.group, posts_count=3)
+        self.assertCounters(self.author.stats, posts_count=3)
+        self.assertCounters(self.author.stats, followers_count=1)
@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+
+from core import jobs
+from core.models import Job
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    NOTIFY_BATCH_SIZE=2,
+    EMAIL_DELIVERY_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class FollowerNotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        for number in range(5):
+            reader = User.objects.create_user(
+                username=f"reader{number}",
+                email=f"reader{number}@mail.ru" if number < 4 else "",
+            )
+            Follow.objects.create(user=reader, author=cls.author)
+
+    def test_new_post(self):
+        """Новый пост ставит задание, подписчики получают письма пачками."""
+        Job.objects.all().delete()
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(mail.outbox, [])
+        jobs.work()
+        self.assertEqual(Job.objects.count(), 2)
+        jobs.work()
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [f"reader{number}@mail.ru" for number in range(4)],
+        )
+        self.assertIn(f"/posts/{post.pk}/", mail.outbox[0].body)
+
+    def test_edit_does_not_notify(self):
+        """Правка поста писем не рассылает."""
+        post = Post.objects.create(author=self.author, text="Пост")
+        Job.objects.all().delete()
+        post.text = "Исправленный пост"
+        post.save()
+        self.assertFalse(Job.objects.exists())
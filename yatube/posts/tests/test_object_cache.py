@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import instrumentation
+from posts import object_cache
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Пост"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_lookups(self):
+        """Повторные поиски по slug, username и id не ходят в БД."""
+        object_cache.get_group_by_slug("group")
+        object_cache.get_user_by_username("author")
+        object_cache.get_post(self.post.id)
+        with self.assertNumQueries(0):
+            group = object_cache.get_group_by_slug("group")
+            author = object_cache.get_user_by_username("author")
+            post = object_cache.get_post(self.post.id)
+        self.assertEqual(group, self.group)
+        self.assertEqual(author.stats.posts_count, 1)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(post.group.title, "Группа")
+
+    def test_local_tier(self):
+        """Объект отдаётся из памяти процесса, даже если L2 его потерял."""
+        object_cache.get_group(self.group.pk)
+        cache.delete(object_cache._key(Group, self.group.pk))
+        with self.assertNumQueries(0):
+            self.assertEqual(object_cache.get_group(self.group.pk), self.group)
+
+    def test_invalidated_on_save(self):
+        """Сохранение и переименование сразу видны в кэше."""
+        object_cache.get_group_by_slug("group")
+        self.group.title = "Новое название"
+        self.group.slug = "renamed"
+        self.group.save()
+        with self.assertRaises(Http404):
+            object_cache.get_group_by_slug("group")
+        renamed = object_cache.get_group_by_slug("renamed")
+        self.assertEqual(renamed.title, "Новое название")
+
+    def test_counters_invalidate(self):
+        """Счётчики автора в кэше обновляются с новым постом."""
+        object_cache.get_post(self.post.id)
+        Post.objects.create(author=self.author, text="Второй пост")
+        post = object_cache.get_post(self.post.id)
+        self.assertEqual(post.author.stats.posts_count, 2)
+
+    def test_get_posts(self):
+        """Пачка постов: промахи одним запросом, порядок сохраняется."""
+        other = Post.objects.create(author=self.author, text="Без группы")
+        object_cache.local_cache().clear()
+        ids = [other.pk, 0, self.post.pk]
+        stats = instrumentation.start()
+        try:
+            with self.assertNumQueries(1):
+                posts = object_cache.get_posts(ids)
+            with self.assertNumQueries(0):
+                again = object_cache.get_posts([other.pk, self.post.pk])
+        finally:
+            instrumentation.stop()
+        self.assertEqual([post.pk for post in posts], [other.pk, self.post.pk])
+        self.assertEqual(again[1].group.title, "Группа")
+        self.assertEqual(again[0].author.username, "author")
+        self.assertEqual(stats.batch_misses, 3)
+        self.assertGreater(stats.batch_items, stats.batch_misses)
+
+    def group_post(self):
+        group = Group.objects.create(title="Удаляемая", slug="deleted")
+        return group, Post.objects.create(
+            author=self.author, group=group, text="Пост группы"
+        )
+
+    @override_settings(PAGE_CACHE=False)
+    def test_group_deleted(self):
+        """Удаление группы не ломает главную и страницу поста."""
+        group, post = self.group_post()
+        self.client.get(reverse("posts:index"))
+        group.delete()
+        response = self.client.get(reverse("posts:index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["page_obj"][0].group)
+        response = self.client.get(
+            reverse("posts:post_detail", args=[post.id])
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_stale_group_reference(self):
+        """Пост из кэша со ссылкой на удалённую группу остаётся без неё."""
+        group, post = self.group_post()
+        object_cache.get_posts([post.pk])
+        object_cache.get_post(post.pk)
+        with mock.patch("posts.signals.object_cache.invalidate_model"):
+            group.delete()
+        self.assertIsNone(object_cache.get_posts([post.pk])[0].group)
+        self.assertIsNone(object_cache.get_post(post.pk).group)
+
+    def test_missing(self):
+        with self.assertRaises(Http404):
+            object_cache.get_post(0)
+        with self.assertRaises(Http404):
+            object_cache.get_user_by_username("nobody")
+
+    def test_lru(self):
+        """L1 вытесняет давно не читанные записи."""
+        lru = object_cache.LRUCache(2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertEqual(
+            (lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3)
+        )
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import instrumentation
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text="Пост"
+        )
+        cls.detail = reverse("posts:post_detail", args=[cls.post.id])
+        cls.group_url = reverse("posts:group_list", args=[cls.group.slug])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_without_queries(self):
+        """Повторный анонимный запрос отдаётся из кэша без БД."""
+        first = self.client.get(self.detail)
+        with self.assertNumQueries(0):
+            second = self.client.get(self.detail)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+        response = self.client.get(
+            self.detail, HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_hit_recorded_under_view_name(self):
+        """Попадание в кэш попадает в метрики под именем URL."""
+        instrumentation.reset()
+        self.client.get(self.detail)
+        self.client.get(self.detail)
+        summary = instrumentation.aggregate()
+        self.assertNotIn("<unresolved>", summary)
+        self.assertEqual(summary["posts:post_detail"]["requests"], 2)
+        self.assertEqual(summary["posts:post_detail"]["cache_hits"], 1)
+
+    def test_query_string_in_key(self):
+        """Разные страницы ленты кэшируются отдельно."""
+        self.client.get(self.group_url)
+        response = self.client.get(self.group_url, {"page": 2})
+        self.assertIsNotNone(response.context)
+
+    def test_invalidated_for_affected_pages(self):
+        """Комментарий сбрасывает страницу поста, но не ленту группы."""
+        self.client.get(self.detail)
+        self.client.get(self.group_url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text="Новый комментарий"
+        )
+        response = self.client.get(self.detail)
+        self.assertContains(response, "Новый комментарий")
+        self.assertIsNotNone(response.context)
+        with self.assertNumQueries(0):
+            self.client.get(self.group_url)
+
+    def test_author_rename_misses(self):
+        """Переименование автора сбрасывает закэшированные страницы."""
+        urls = (reverse("posts:index"), self.detail)
+        for url in urls:
+            self.client.get(url)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = "Переименованный"
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIsNotNone(response.context)
+                self.assertContains(response, "Переименованный")
+
+    def test_logged_in_bypass(self):
+        """С cookie сессии кэш не используется и не заполняется."""
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.detail)
+        response = client.get(self.detail)
+        self.assertIsNotNone(response.context)
+        self.assertContains(response, "Редактировать запись")
+        self.assertNotContains(self.client.get(self.detail), "Редактировать")
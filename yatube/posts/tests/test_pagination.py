@@ -0,0 +1,186 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Post
+from posts.pagination import FeedPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class FeedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="TestAuthor")
+        Post.objects.bulk_create(
+            Post(text=f"Тестовый пост {i}", author=cls.author)
+            for i in range(25)
+        )
+        cls.ordered = list(Post.objects.order_by("-pub_date", "-id"))
+
+    def setUp(self):
+        self.paginator = FeedPaginator(
+            Post.objects.all(), 10, offset_pages=1
+        )
+
+    def test_cursor_roundtrip(self):
+        """Курсор кодируется и декодируется без потерь."""
+        post = self.ordered[0]
+        direction, pub_date, pk = decode_cursor(encode_cursor(post))
+        self.assertEqual((pub_date, pk), (post.pub_date, post.pk))
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдаёт первую страницу."""
+        page = self.paginator.cursor_page("не-курсор")
+        self.assertEqual(list(page), self.ordered[:10])
+
+    @override_settings(PAGE_CACHE=False)
+    def test_broken_cursor_has_page_numbers(self):
+        """Первая страница вместо битого курсора — с номерами страниц."""
+        response = Client().get(reverse("posts:index"), {"cursor": "x"})
+        self.assertFalse(response.context["page_obj"].is_cursor)
+        self.assertTrue(response.context["page_range"])
+        self.assertContains(response, "page=2")
+
+    def test_count_function_called_once(self):
+        """Функция числа объектов вызывается один раз на пагинатор."""
+        calls = []
+
+        def count():
+            calls.append(1)
+            return 25
+
+        paginator = FeedPaginator(Post.objects.all(), 10, count=count)
+        self.assertEqual(paginator.approximate_count, 25)
+        self.assertEqual(paginator.approximate_count, 25)
+        self.assertEqual(len(calls), 1)
+
+    def test_offset_page_links_to_cursor(self):
+        """Последняя OFFSET-страница ссылается дальше курсором."""
+        page = self.paginator.get_page(1)
+        self.assertEqual(list(self.paginator.page_range), [1])
+        self.assertTrue(self.paginator.has_deep_pages)
+        next_page = self.paginator.cursor_page(page.next_cursor)
+        self.assertEqual(list(next_page), self.ordered[10:20])
+        self.assertTrue(next_page.has_next())
+        self.assertTrue(next_page.has_previous())
+
+    def test_cursor_walks_forward_and_back(self):
+        """Курсоры вперёд и назад не теряют и не дублируют посты."""
+        page = self.paginator.cursor_page(
+            self.paginator.get_page(1).next_cursor
+        )
+        last = self.paginator.cursor_page(page.next_cursor)
+        self.assertEqual(list(last), self.ordered[20:])
+        self.assertFalse(last.has_next())
+        back = self.paginator.cursor_page(last.previous_cursor)
+        self.assertEqual(list(back), self.ordered[10:20])
+        first = self.paginator.cursor_page(back.previous_cursor)
+        self.assertEqual(list(first), self.ordered[:10])
+        self.assertFalse(first.has_previous())
+
+    def test_last_cursor(self):
+        """Курсор last отдаёт хвост ленты без COUNT(*)."""
+        with self.assertNumQueries(1):
+            page = self.paginator.cursor_page("last")
+            self.assertEqual(list(page), self.ordered[15:])
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+    def test_index_accepts_cursor(self):
+        """Главная страница листается параметром cursor."""
+        cursor = encode_cursor(self.ordered[9])
+        response = Client().get(reverse("posts:index"), {"cursor": cursor})
+        self.assertEqual(
+            list(response.context["page_obj"]), self.ordered[10:20]
+        )
+
+    def test_stale_count_falls_back(self):
+        """Отставший счётчик не обрезает страницы."""
+        paginator = FeedPaginator(Post.objects.all(), 10, count=0)
+        self.assertEqual(list(paginator.get_page(2)), self.ordered[10:20])
+        self.assertEqual(paginator.count, 25)
+        paginator = FeedPaginator(Post.objects.all(), 10, count=5)
+        self.assertEqual(list(paginator.get_page(1)), self.ordered[:10])
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_overstated_count_corrected(self):
+        """Завышенный счётчик исправляется по неполной странице."""
+        paginator = FeedPaginator(Post.objects.all(), 10, count=100)
+        page = paginator.get_page(3)
+        self.assertEqual(list(page), self.ordered[20:])
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.get_page(7).number, 3)
+
+    def test_elided_page_range(self):
+        """Номера страниц: края, окно вокруг текущей и пропуски."""
+        paginator = FeedPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            paginator.elided_page_range(12, on_each_side=2),
+            [1, None, 10, 11, 12, 13, 14, None, 25],
+        )
+        self.assertEqual(
+            paginator.elided_page_range(3, on_each_side=1),
+            [1, 2, 3, 4, None, 25],
+        )
+        self.assertEqual(
+            FeedPaginator(Post.objects.all(), 10).elided_page_range(1),
+            [1, 2, 3],
+        )
+
+    @override_settings(
+        FEED_PAGE_SIZES={"index": 2},
+        PAGE_RANGE_ON_EACH_SIDE=1,
+        PAGE_CACHE=False,
+    )
+    def test_index_page_size_and_window(self):
+        """Размер страницы ленты из настроек, номера страниц — окном."""
+        cache.clear()
+        response = Client().get(reverse("posts:index"), {"page": 6})
+        self.assertEqual(len(response.context["page_obj"]), 2)
+        self.assertEqual(
+            response.context["page_range"], [1, None, 5, 6, 7, None, 13]
+        )
+        # Первая, предыдущая, семь элементов окна, следующая, последняя.
+        self.assertContains(response, "page-link", count=11)
+
+
+@override_settings(PAGE_CACHE=False, COUNT_MAX_STALENESS=60)
+class ApproximateCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="TestAuthor")
+        Post.objects.bulk_create(
+            Post(text=f"Тестовый пост {i}", author=cls.author)
+            for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse("posts:index"))
+        self.assertEqual(response.context["page_obj"].paginator.count, 3)
+        return sum("COUNT(" in query["sql"] for query in queries)
+
+    @override_settings(COUNT_EXACT_BELOW=0)
+    def test_index_count_cached(self):
+        """Большая выборка считается один раз и сдвигается сигналами."""
+        self.assertEqual(self.count_queries(), 1)
+        self.assertEqual(self.count_queries(), 0)
+        post = Post.objects.create(text="Новый пост", author=self.author)
+        self.assertEqual(counters.posts_count(), 4)
+        post.delete()
+        self.assertEqual(counters.posts_count(), 3)
+
+    @override_settings(COUNT_EXACT_BELOW=10)
+    def test_small_count_exact(self):
+        """Выборка меньше COUNT_EXACT_BELOW считается на каждый запрос."""
+        self.assertEqual(self.count_queries(), 1)
+        self.assertEqual(self.count_queries(), 1)
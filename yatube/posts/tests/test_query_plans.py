@@ -0,0 +1,83 @@
+import unittest
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.pagination import encode_cursor
+
+User = get_user_model()
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "EXPLAIN QUERY PLAN")
+class FeedQueryPlanTests(TestCase):
+    """Запросы лент идут по индексам, без полного сканирования и сортировки
+    во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="TestAuthor")
+        cls.group = Group.objects.create(title="Группа", slug="test_slug")
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(3):
+            cls.post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {i}"
+            )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text="Комментарий"
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedQueries(self, url, allow_temp_sort=False, **params):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, params)
+        for query in queries.captured_queries:
+            sql = query["sql"]
+            if not sql.startswith("SELECT") or "posts_" not in sql:
+                continue
+            for step in self.explain(sql):
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertFalse(
+                        step.startswith("SCAN") and "USING" not in step,
+                        "полное сканирование таблицы",
+                    )
+                    if not allow_temp_sort:
+                        self.assertNotIn("TEMP B-TREE", step)
+
+    def test_feed_queries_use_indexes(self):
+        """Главная, группа и профиль, в том числе по курсору."""
+        cursor = encode_cursor(self.post)
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_list", kwargs={"slug": "test_slug"}),
+            reverse("posts:profile", kwargs={"username": "TestAuthor"}),
+        )
+        for url in urls:
+            self.assertIndexedQueries(url)
+            self.assertIndexedQueries(url, cursor=cursor)
+
+    def test_post_detail_queries_use_indexes(self):
+        self.assertIndexedQueries(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.id})
+        )
+
+    def test_follow_feed_queries_use_indexes(self):
+        """Лента подписок сливает посты авторов из индекса
+        (author, pub_date) и сортирует только их, без полного
+        сканирования постов."""
+        self.assertIndexedQueries(
+            reverse("posts:follow_index"), allow_temp_sort=True
+        )
@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post, SearchPosting
+
+User = get_user_model()
+
+
+class SearchMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="TestAuthor")
+        cls.other = User.objects.create_user(username="Other")
+        cls.group = Group.objects.create(title="Группа", slug="group")
+        cls.rare = Post.objects.create(
+            author=cls.author, group=cls.group, text="Котики котики и собаки"
+        )
+        cls.common = Post.objects.create(
+            author=cls.other, text="Собаки гуляют, котики спят"
+        )
+        cls.unrelated = Post.objects.create(author=cls.other, text="Погода")
+
+    def test_ranked_results(self):
+        """Чаще встречающееся слово поднимает пост выше."""
+        self.assertEqual(
+            search.search_ids("котики"), [self.rare.pk, self.common.pk]
+        )
+
+    def test_all_terms_required(self):
+        """Пост должен содержать все слова запроса."""
+        self.assertEqual(search.search_ids("гуляют котики"), [self.common.pk])
+
+    def test_filters(self):
+        """Выдачу можно ограничить группой и автором."""
+        self.assertEqual(
+            search.search_ids("собаки", group=self.group), [self.rare.pk]
+        )
+        self.assertEqual(
+            search.search_ids("собаки", author=self.other), [self.common.pk]
+        )
+
+    def test_incremental_update(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        post = Post.objects.create(author=self.author, text="Дождь")
+        post.text = "Котики в погоде"
+        post.save()
+        self.assertEqual(search.search_ids("погоде"), [post.pk])
+        self.assertEqual(search.search_ids("дождь"), [])
+        post.delete()
+        self.assertEqual(search.search_ids("погоде"), [])
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс."""
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(search.search_ids("погода"), [self.unrelated.pk])
+
+    def test_search_view(self):
+        """Страница поиска выводит найденные посты с пагинацией."""
+        response = Client().get(
+            reverse("posts:search"), {"q": "КОТИКИ", "group": "group"}
+        )
+        self.assertEqual(list(response.context["page_obj"]), [self.rare])
+        self.assertTrue(
+            response.context["page_query"].endswith("&group=group&")
+        )
+
+    def test_search_unknown_author(self):
+        """Несуществующий автор — ошибка формы и пустая выдача, не 404."""
+        response = Client().get(
+            reverse("posts:search"), {"q": "котики", "author": "ghost"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context["page_obj"]), [])
+        self.assertContains(response, "Такого автора нет.")
+
+
+class FTS5SearchTests(SearchMixin, TestCase):
+    def test_backend(self):
+        self.assertIsInstance(search.get_backend(), search.FTS5Backend)
+
+    def test_index_without_introspection(self):
+        """Найденная таблица FTS5 не ищется заново при каждой записи."""
+        search.index_post(self.rare)
+        with self.assertNumQueries(2):
+            search.index_post(self.rare)
+
+
+@override_settings(POSTS_SEARCH_BACKEND="python")
+class PythonSearchTests(SearchMixin, TestCase):
+    def test_backend(self):
+        self.assertIsInstance(search.get_backend(), search.PythonBackend)
+        self.assertTrue(SearchPosting.objects.filter(term="котики").exists())
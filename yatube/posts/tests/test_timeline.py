@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import jobs
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(TIMELINE_FANOUT=True, TIMELINE_FANOUT_MAX_FOLLOWERS=1)
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username="reader")
+        self.author = User.objects.create_user(username="author")
+        self.client_auth = Client()
+        self.client_auth.force_login(self.reader)
+
+    def feed(self):
+        response = self.client_auth.get(reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_fan_out_on_create(self):
+        """Новый пост попадает в материализованную ленту подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый пост")
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
+
+    def test_backfill_and_prune(self):
+        """Подписка заполняет ленту, отписка её чистит."""
+        post = Post.objects.create(author=self.author, text="Старый пост")
+        self.client_auth.get(
+            reverse("posts:profile_follow", args=[self.author.username])
+        )
+        self.assertEqual(self.feed(), [post])
+        self.client_auth.get(
+            reverse("posts:profile_unfollow", args=[self.author.username])
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [])
+
+    def test_celebrity_merged_on_read(self):
+        """Посты популярного автора не раскладываются, но видны в ленте."""
+        fan = User.objects.create_user(username="fan")
+        Follow.objects.create(user=fan, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Для всех")
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_former_celebrity_posts_kept(self):
+        """Посты, написанные выше порога, остаются в ленте после него."""
+        fan = User.objects.create_user(username="fan")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        post = Post.objects.create(author=self.author, text="Для всех")
+        Follow.objects.get(user=fan).delete()
+        jobs.work()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post])
@@ -5,11 +5,14 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from posts import feed_cache
 from posts.forms import PostForm
-from posts.models import Follow, Group, Post
+from posts.models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -258,6 +261,7 @@ class CacheTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username="HasNoName")
         self.authorized_client = Client()
@@ -266,15 +270,91 @@ class CacheTests(TestCase):
     def test_cache_index(self):
         """Тест кэширования страницы index.html"""
         first_state = self.authorized_client.get(reverse("posts:index"))
-        post_1 = Post.objects.get(id=1)
-        post_1.text = "Измененный текст"
-        post_1.save()
+        Post.objects.filter(id=self.post.id).update(text="Измененный текст")
         second_state = self.authorized_client.get(reverse("posts:index"))
         self.assertEqual(first_state.content, second_state.content)
         cache.clear()
         third_state = self.authorized_client.get(reverse("posts:index"))
         self.assertNotEqual(first_state.content, third_state.content)
 
+    def test_cache_invalidated_on_post_save(self):
+        """Изменение поста сразу видно на главной и в профиле."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:profile", kwargs={"username": "TestAuthor"}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        self.post.text = "Измененный текст"
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "Измененный текст")
+
+    def _warm_feeds(self):
+        group = Group.objects.create(title="Группа", slug="old-slug")
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        feed_cache.bump(feed_cache.site_scope())
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:profile", kwargs={"username": "TestAuthor"}),
+        )
+        for url in urls:
+            self.authorized_client.get(url)
+        return group, urls
+
+    def test_author_rename_invalidates_fragments(self):
+        """Новое имя автора видно во всех лентах."""
+        _, urls = self._warm_feeds()
+        author = User.objects.get(username="TestAuthor")
+        author.first_name = "Переименованный"
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "Переименованный")
+
+    def test_group_change_invalidates_fragments(self):
+        """Новый slug группы виден во всех лентах с её постами."""
+        group, urls = self._warm_feeds()
+        group.slug = "new-slug"
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, "/group/new-slug/")
+
+    @override_settings(PAGE_CACHE=False)
+    def test_fragment_hit_skips_page_query(self):
+        """При попавшем фрагменте строки страницы не выбираются."""
+        self.guest_client.get(reverse("posts:index"))
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(reverse("posts:index"))
+        selects = [
+            query["sql"]
+            for query in queries
+            if 'FROM "posts_post"' in query["sql"]
+            and "COUNT(" not in query["sql"]
+        ]
+        self.assertEqual(selects, [])
+
+    def test_follow_feed_not_shared_with_index(self):
+        """Лента подписок не берёт фрагмент главной страницы."""
+        self.authorized_client.get(reverse("posts:index"))
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        self.assertNotContains(response, self.post.text)
+
+    @override_settings(PAGE_CACHE=False)
+    def test_cache_stats(self):
+        """Кэш лент считает попадания и промахи."""
+        feed_cache.reset_stats()
+        self.guest_client.get(reverse("posts:index"))
+        self.guest_client.get(reverse("posts:index"))
+        self.assertEqual(
+            feed_cache.stats()["index"], {"hits": 1, "misses": 1}
+        )
+
 
 class FollowTests(TestCase):
     def setUp(self):
@@ -347,3 +427,111 @@ class FollowTests(TestCase):
         self.assertNotContains(
             response, "Тестовая запись для тестирования ленты"
         )
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="TestAuthor")
+        cls.group = Group.objects.create(title="Группа", slug="test_slug")
+        for i in range(10):
+            author = User.objects.create_user(username=f"author{i}")
+            Follow.objects.create(user=cls.reader, author=author)
+            Post.objects.create(
+                text=f"Пост {i}",
+                author=author,
+                group=Group.objects.create(title=f"Группа {i}", slug=f"g{i}"),
+            )
+            Post.objects.create(
+                text=f"Пост группы {i}", author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_query_count(self):
+        """Число запросов ленты не зависит от числа постов на странице.
+
+        Посты, которых нет в кэше, догружаются одним запросом id__in;
+        посты профиля уже закэшированы лентой группы.
+        """
+        pages = {
+            reverse("posts:index"): 3,
+            reverse("posts:group_list", kwargs={"slug": "test_slug"}): 3,
+            reverse("posts:profile", kwargs={"username": "TestAuthor"}): 2,
+        }
+        for url, queries in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_follow_index_query_count(self):
+        """Лента подписок не делает запросов на каждый пост."""
+        with self.assertNumQueries(5):
+            response = self.authorized_client.get(
+                reverse("posts:follow_index")
+            )
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username="TestAuthor"),
+            text="Популярный пост",
+        )
+        for i in range(25):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f"reader{i}"),
+                text=f"Комментарий {i}",
+            )
+        cls.detail_url = reverse(
+            "posts:post_detail", kwargs={"post_id": cls.post.id}
+        )
+        cls.comments_url = reverse(
+            "posts:comments", kwargs={"post_id": cls.post.id}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_initial_render_is_capped(self):
+        """На странице поста не больше 20 комментариев, авторы без N+1."""
+        with self.assertNumQueries(2):
+            response = self.client.get(self.detail_url)
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, "Комментарий 0")
+        self.assertTrue(response.context["comments_query"])
+
+    def test_load_more_fragment(self):
+        """Фрагмент «показать ещё» продолжает с места курсора."""
+        query = self.client.get(self.detail_url).context["comments_query"]
+        response = self.client.get(f"{self.comments_url}?{query}")
+        self.assertTemplateUsed(response, "posts/includes/comment_list.html")
+        texts = [comment.text for comment in response.context["comments"]]
+        self.assertEqual(texts, [f"Комментарий {i}" for i in range(20, 25)])
+        self.assertEqual(response.context["comments_query"], "")
+
+    def test_newest_first_json(self):
+        """JSON-выдача отдаёт новые комментарии первыми."""
+        response = self.client.get(
+            self.comments_url, {"format": "json", "comments": "new"}
+        )
+        data = response.json()
+        self.assertEqual(data["comments"][0]["text"], "Комментарий 24")
+        self.assertEqual(len(data["comments"]), 20)
+        next_page = self.client.get(data["next"]).json()
+        self.assertEqual(
+            [comment["text"] for comment in next_page["comments"]],
+            [f"Комментарий {i}" for i in range(4, -1, -1)],
+        )
+        self.assertIsNone(next_page["next"])
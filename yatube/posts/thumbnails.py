@@ -0,0 +1,84 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import feed_cache, object_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POST_THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def render(image):
+    """Готовит все размеры из POST_THUMBNAILS, возвращает {имя: url}."""
+    urls = {}
+    for name, options in settings.POST_THUMBNAILS.items():
+        options = dict(options)
+        geometry = options.pop("geometry")
+        urls[name] = get_thumbnail(image, geometry, **options).url
+    return urls
+
+
+def generate(post_id, post=None):
+    """Генерирует миниатюры поста и сохраняет их адреса в Post.thumbnails.
+
+    post — уже загруженный пост, чтобы не читать его повторно.
+    """
+    if post is None:
+        post = (
+            Post.objects.filter(pk=post_id)
+            .only("image", "author_id", "group_id")
+            .first()
+        )
+    if post is None or not post.image:
+        return None
+    urls = render(post.image)
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails=json.dumps(urls)
+    )
+    if updated:
+        feed_cache.bump(
+            *feed_cache.post_scopes(post.author_id, post.group_id, post_id)
+        )
+        # update() идёт мимо сигналов: кэш поста и его карточки сбрасываем.
+        object_cache.invalidate(Post, post_id)
+    return urls
+
+
+def _work(post_id):
+    close_old_connections()
+    try:
+        generate(post_id)
+    except Exception:
+        logger.exception("Не удалось сделать миниатюры поста %s", post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр в фоновый пул после коммита транзакции.
+
+    При POST_THUMBNAIL_ASYNC = False миниатюры делаются сразу, в запросе.
+    """
+    if not post.image:
+        return
+    if not settings.POST_THUMBNAIL_ASYNC:
+        generate(post.pk, post)
+        return
+    post_id = post.pk
+    transaction.on_commit(lambda: get_executor().submit(_work, post_id))
@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db.models import Q
+
+from core import jobs
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 500
+FAN_OUT_AUTHOR_TASK = "posts.timeline.fan_out_author"
+
+
+def is_enabled():
+    return settings.TIMELINE_FANOUT
+
+
+def celebrity_ids(author_ids=None):
+    """Авторы, чьи посты не раскладываются по лентам, а читаются на лету."""
+    stats = UserStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_MAX_FOLLOWERS
+    )
+    if author_ids is not None:
+        stats = stats.filter(user_id__in=author_ids)
+    return stats.values_list("user_id", flat=True)
+
+
+def is_celebrity(author_id):
+    return celebrity_ids([author_id]).exists()
+
+
+def _push(pairs):
+    """Вставляет пары (user_id, post_id) пачками, пропуская дубликаты."""
+    batch = []
+    for user_id, post_id in pairs:
+        batch.append(TimelineEntry(user_id=user_id, post_id=post_id))
+        if len(batch) >= BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_enabled() or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _push((user_id, post.pk) for user_id in followers.iterator())
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика уже опубликованные посты."""
+    if not is_enabled() or is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", flat=True
+    )
+    _push((user_id, post_id) for post_id in posts.iterator())
+
+
+def fan_out_author(author_id):
+    """Раскладывает все посты автора по лентам его подписчиков.
+
+    Посты, написанные, пока подписчиков было больше порога, ни в одну
+    ленту не попали. Когда автор опускается до порога, его посты
+    перестают подмешиваться при чтении, и ленты дополняются ими.
+    """
+    if not is_enabled() or is_celebrity(author_id):
+        return
+    post_ids = list(
+        Post.objects.filter(author_id=author_id).values_list("pk", flat=True)
+    )
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        "user_id", flat=True
+    )
+    _push(
+        (user_id, post_id)
+        for user_id in followers.iterator()
+        for post_id in post_ids
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    if not is_enabled():
+        return
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__in=Post.objects.filter(author_id=author_id).values("pk"),
+    ).delete()
+    dropped_to_threshold = UserStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.TIMELINE_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+    if dropped_to_threshold:
+        jobs.enqueue(FAN_OUT_AUTHOR_TASK, author_id=author_id)
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты заново; возвращает число подписок."""
+    follows = Follow.objects.exclude(author_id__in=celebrity_ids())
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+    entries.delete()
+    total = 0
+    for user_id, author_id in follows.values_list("user_id", "author_id"):
+        backfill(user_id, author_id)
+        total += 1
+    return total
+
+
+def follow_feed(user):
+    """Лента подписок пользователя.
+
+    В режиме fan-out посты берутся из материализованной ленты, а посты
+    авторов с большим числом подписчиков подмешиваются при чтении.
+    """
+    posts = Post.objects.for_feed()
+    if not is_enabled():
+        return posts.filter(author__following__user=user)
+    followed = Follow.objects.filter(user=user).values_list(
+        "author_id", flat=True
+    )
+    return posts.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values("post_id"))
+        | Q(author_id__in=celebrity_ids(followed))
+    )
@@ -1,20 +1,37 @@
 from django.urls import path
 
-from . import views
+from . import syndication, views
 
 app_name = "posts"
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("feed/<str:fmt>/", syndication.index_feed, name="index_feed"),
     path("group/<slug:slug>/", views.group_posts, name="group_list"),
+    path(
+        "group/<slug:slug>/feed/<str:fmt>/",
+        syndication.group_feed,
+        name="group_feed",
+    ),
     path("profile/<str:username>/", views.profile, name="profile"),
+    path(
+        "profile/<str:username>/feed/<str:fmt>/",
+        syndication.profile_feed,
+        name="profile_feed",
+    ),
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
     path("create/", views.post_create, name="post_create"),
     path("posts/<int:post_id>/edit/", views.post_edit, name="post_edit"),
     path(
         "posts/<int:post_id>/comment/", views.add_comment, name="add_comment"
     ),
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="comments",
+    ),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search_posts, name="search"),
     path(
         "profile/<str:username>/follow/",
         views.profile_follow,
@@ -1,50 +1,151 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.http import urlencode
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from . import counters, feed_cache, search
+from .conditional import (
+    conditional,
+    get_author,
+    get_group,
+    get_post,
+    group_scopes,
+    index_scopes,
+    post_scopes,
+    profile_scopes,
+)
+from .forms import CommentForm, PostForm, SearchForm
+from .models import Follow, Post
+from .object_cache import get_posts, get_user_by_username
+from .pagination import FeedPaginator, keyset_slice
+from .timeline import follow_feed
 
 LIMIT_POSTS = 10
+OFFSET_PAGES = 50
+LIMIT_COMMENTS = 20
+COMMENT_ORDERS = {"old": False, "new": True}
 
 
-def get_pagination(queryset, request):
-    paginator = Paginator(queryset, LIMIT_POSTS)
+def assemble_posts(rows):
+    """Посты страницы из кэша объектов по id её строк."""
+    return get_posts([row.pk for row in rows])
+
+
+def get_pagination(
+    queryset, request, count=None, assemble=False, feed=None
+):
+    """Страница ленты; размер страницы берётся из FEED_PAGE_SIZES[feed]."""
+    paginator = FeedPaginator(
+        queryset,
+        settings.FEED_PAGE_SIZES.get(feed, LIMIT_POSTS),
+        offset_pages=OFFSET_PAGES,
+        count=count,
+        assemble=assemble_posts if assemble else None,
+    )
     page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    cursor = request.GET.get("cursor")
+    if cursor:
+        page_obj = paginator.cursor_page(cursor)
+    else:
+        page_obj = paginator.get_page(page_number)
+    page_range = []
+    # Битый или устаревший курсор отдаёт обычную первую страницу.
+    if not page_obj.is_cursor:
+        page_range = paginator.elided_page_range(
+            page_obj.number,
+            settings.PAGE_RANGE_ON_EACH_SIDE,
+            settings.PAGE_RANGE_ON_ENDS,
+        )
+    page_query = request.GET.copy()
+    page_query.pop("page", None)
+    page_query.pop("cursor", None)
     return {
+        "page_query": page_query.urlencode() + "&" if page_query else "",
         "paginator": paginator,
         "page_number": page_number,
         "page_obj": page_obj,
+        "page_range": page_range,
     }
 
 
+def get_comments(post, request):
+    order = request.GET.get("comments")
+    if order not in COMMENT_ORDERS:
+        order = "old"
+    comments, next_cursor = keyset_slice(
+        post.comments.select_related("author").only(
+            "text", "created", "post", "author", "author__username"
+        ),
+        request.GET.get("comments_cursor"),
+        LIMIT_COMMENTS,
+        "created",
+        descending=COMMENT_ORDERS[order],
+    )
+    comments_query = ""
+    if next_cursor:
+        comments_query = urlencode(
+            {"comments": order, "comments_cursor": next_cursor}
+        )
+    return {
+        "comments": comments,
+        "comments_order": order,
+        "comments_query": comments_query,
+    }
+
+
+@conditional(index_scopes)
 def index(request):
     """Главная страница."""
-    page_obj = Post.objects.all()
+    page_obj = Post.objects.for_feed()
     context = {
         "page_obj": page_obj,
     }
-    context.update(get_pagination(page_obj, request))
+    context.update(
+        get_pagination(
+            page_obj,
+            request,
+            counters.posts_count,
+            assemble=True,
+            feed=feed_cache.INDEX,
+        )
+    )
+    context["feed_cache"] = feed_cache.fragment(
+        feed_cache.INDEX, context["page_obj"]
+    )
     return render(request, "posts/index.html", context)
 
 
+@conditional(group_scopes)
 def group_posts(request, slug):
     """Страница со списком постов."""
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_group(request, slug)
+    posts = group.posts.for_feed()
     context = {
         "group": group,
         "posts": posts,
     }
-    context.update(get_pagination(posts, request))
+    context.update(
+        get_pagination(
+            posts,
+            request,
+            group.posts_count,
+            assemble=True,
+            feed=feed_cache.GROUP,
+        )
+    )
+    context["feed_cache"] = feed_cache.fragment(
+        feed_cache.GROUP, context["page_obj"], group=group
+    )
     return render(request, "posts/group_list.html", context)
 
 
+@conditional(profile_scopes)
 def profile(request, username):
     """Страница с профайлом пользователя"""
-    author = get_object_or_404(User, username=username)
+    author = get_author(request, username)
+    stats = getattr(author, "stats", None)
     following = (
         request.user.is_authenticated
         and author.following.filter(user=request.user).exists()
@@ -53,27 +154,84 @@ def profile(request, username):
         "author": author,
         "following": following,
     }
-    context.update(get_pagination(author.posts.all(), request))
+    context.update(
+        get_pagination(
+            author.posts.for_feed(),
+            request,
+            stats.posts_count if stats else None,
+            assemble=True,
+            feed=feed_cache.PROFILE,
+        )
+    )
+    context["feed_cache"] = feed_cache.fragment(
+        feed_cache.PROFILE, context["page_obj"], author=author
+    )
     return render(request, "posts/profile.html", context)
 
 
+@conditional(post_scopes)
 def post_detail(request, post_id):
     """Страница просмотра поста"""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_post(request, post_id)
     group = post.group
     author = post.author
     form = CommentForm()
-    comments = post.comments.all()
     context = {
         "post": post,
         "group": group,
         "author": author,
         "form": form,
-        "comments": comments,
     }
+    context.update(get_comments(post, request))
     return render(request, "posts/post_detail.html", context)
 
 
+def post_comments(request, post_id):
+    """Следующая порция комментариев: HTML-фрагмент или JSON"""
+    post = get_post(request, post_id)
+    context = {"post": post}
+    context.update(get_comments(post, request))
+    if request.GET.get("format") != "json":
+        return render(request, "posts/includes/comment_list.html", context)
+    next_url = None
+    if context["comments_query"]:
+        next_url = "%s?format=json&%s" % (
+            reverse("posts:comments", args=[post.id]),
+            context["comments_query"],
+        )
+    return JsonResponse(
+        {
+            "comments": [
+                {
+                    "id": comment.id,
+                    "author": comment.author.username,
+                    "text": comment.text,
+                    "created": comment.created.isoformat(),
+                }
+                for comment in context["comments"]
+            ],
+            "next": next_url,
+        }
+    )
+
+
+def search_posts(request):
+    """Поиск по постам"""
+    form = SearchForm(request.GET or None)
+    query, group, author = "", None, None
+    if form.is_valid():
+        query = form.cleaned_data["q"]
+        group = form.cleaned_data["group"]
+        author = form.cleaned_data["author"]
+    context = {"form": form, "query": query}
+    context.update(
+        get_pagination(
+            search.search(query, group, author), request, feed="search"
+        )
+    )
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def post_create(request):
     """Создание новой записи"""
@@ -108,7 +266,7 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     """Добавление комментария"""
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_post(request, post_id)
     form = CommentForm(request.POST or None)
     comment = form.save(commit=False)
     comment.author = request.user
@@ -120,9 +278,20 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """Вывод постов авторов, на которых подписан текущий юзер"""
-    page_obj = Post.objects.filter(author__following__user=request.user)
+    page_obj = follow_feed(request.user)
     context = {"page_obj": page_obj}
-    context.update(get_pagination(page_obj, request))
+    context.update(
+        get_pagination(
+            page_obj,
+            request,
+            lambda: counters.follow_count(request.user, page_obj),
+            assemble=True,
+            feed=feed_cache.FOLLOW,
+        )
+    )
+    context["feed_cache"] = feed_cache.fragment(
+        feed_cache.FOLLOW, context["page_obj"], viewer=request.user
+    )
     return render(request, "posts/follow.html", context)
 
 
@@ -130,7 +299,7 @@ def follow_index(request):
 def profile_follow(request, username):
     """Подписаться на автора"""
     user = request.user
-    author = get_object_or_404(User, username=username)
+    author = get_user_by_username(username)
     if user != author:
         Follow.objects.get_or_create(user=user, author=author)
     return redirect(reverse("posts:profile", args=[username]))
@@ -139,7 +308,7 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     """Отписаться от автора"""
-    author = get_object_or_404(User, username=username)
+    author = get_user_by_username(username)
     is_follower = Follow.objects.filter(user=request.user, author=author)
     if is_follower.exists():
         is_follower.delete()
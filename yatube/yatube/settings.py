@@ -23,7 +23,6 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
-    "debug_toolbar",
     "users.apps.UsersConfig",
     "core.apps.CoreConfig",
     "about.apps.AboutConfig",
@@ -31,25 +30,40 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.InstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "posts.middleware.AnonymousPageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
+
 ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+# Без DEBUG скомпилированные шаблоны явно кэшируются в памяти процесса,
+# с DEBUG перечитываются с диска при каждом рендере.
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)
+    ]
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [TEMPLATES_DIR],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": TEMPLATE_LOADERS,
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
@@ -103,7 +117,10 @@ LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:index"
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Письма ставятся в очередь core.jobs и уходят через
+# EMAIL_DELIVERY_BACKEND в воркере (python manage.py run_jobs).
+EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
@@ -116,8 +133,155 @@ CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
-CACHES = {
-    "default": {
+# Кэш: "locmem" — свой у каждого процесса; "sqlite" — общий файл для
+# всех воркеров хоста с LRU-вытеснением по числу записей и размеру.
+CACHE_BACKENDS = {
+    "locmem": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-    }
+    },
+    "sqlite": {
+        "BACKEND": "core.cache.SQLiteCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache.sqlite3"),
+        "OPTIONS": {
+            "MAX_ENTRIES": 100000,
+            "MAX_SIZE": 256 * 1024 * 1024,
+        },
+    },
+}
+CACHE_BACKEND = "locmem"
+CACHES = {
+    "default": CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+# Материализованная лента подписок: новые посты раскладываются по лентам
+# подписчиков при публикации. Посты авторов, у которых подписчиков больше
+# порога, не раскладываются, а подмешиваются при чтении.
+TIMELINE_FANOUT = False
+TIMELINE_FANOUT_MAX_FOLLOWERS = 1000
+
+# Время жизни закэшированных фрагментов лент, секунды. Свежесть
+# обеспечивают сигналы, TTL лишь ограничивает память под старые ключи.
+FEED_CACHE_TTL = 60 * 5
+
+# Миниатюры картинок постов готовятся в фоновом пуле потоков при
+# сохранении PostForm; до готовности шаблоны показывают заглушку.
+POST_THUMBNAILS = {
+    "card": {"geometry": "960x339", "crop": "center", "upscale": True},
+}
+POST_THUMBNAIL_ASYNC = True
+POST_THUMBNAIL_WORKERS = 2
+
+# Поиск по постам: "auto" — FTS5 на SQLite, если таблица создана
+# миграцией, иначе инвертированный индекс на Python; "fts5"/"python" —
+# выбрать явно.
+POSTS_SEARCH_BACKEND = "auto"
+POSTS_SEARCH_MAX_RESULTS = 1000
+
+
+# Замеры запросов: число и время SQL, рендер шаблонов, кэш и общее время
+# по именам URL. Последние INSTRUMENTATION_BUFFER_SIZE запросов доступны
+# персоналу на /core/metrics/; запросы сверх бюджета пишутся в лог.
+# INSTRUMENTATION_BUDGETS переопределяет бюджет для отдельных URL:
+# {"posts:follow_index": {"queries": 10, "ms": 200}}.
+INSTRUMENTATION = True
+INSTRUMENTATION_BUFFER_SIZE = 1000
+INSTRUMENTATION_QUERY_BUDGET = 20
+INSTRUMENTATION_TIME_BUDGET_MS = 500
+INSTRUMENTATION_BUDGETS = {
+    # С POST_THUMBNAIL_ASYNC = False миниатюры делаются прямо в запросе,
+    # и sorl-thumbnail добавляет дюжину запросов к своему kvstore.
+    "posts:post_create": {"queries": 25},
+    "posts:post_edit": {"queries": 25},
 }
+
+# Журнал SQL (логгер core.sql, файл SQL_LOG_FILE): запросы дольше
+# SLOW_QUERY_MS, одинаковые запросы, повторённые в одном HTTP-запросе
+# DUPLICATE_QUERY_THRESHOLD раз, и похожие на N+1 — один запрос с
+# N_PLUS_ONE_THRESHOLD разными наборами параметров. Сводка по журналу:
+# python manage.py sql_report sql.log
+QUERY_LOG = True
+SLOW_QUERY_MS = 100
+DUPLICATE_QUERY_THRESHOLD = 2
+N_PLUS_ONE_THRESHOLD = 5
+SQL_LOG_FILE = os.path.join(BASE_DIR, "sql.log")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "sql": {"format": "%(asctime)s %(message)s"},
+    },
+    "handlers": {
+        "sql_file": {
+            "class": "logging.FileHandler",
+            "filename": SQL_LOG_FILE,
+            "formatter": "sql",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "core.sql": {
+            "handlers": ["sql_file"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Кэш целых страниц лент и постов для анонимных читателей; запись
+# устаревает вместе с поколениями feed_cache, TTL ограничивает память.
+PAGE_CACHE = True
+PAGE_CACHE_TTL = 60 * 10
+
+# Кэш горячих объектов (группы, пользователи, посты): LRU на
+# OBJECT_CACHE_L1_SIZE записей в памяти процесса перед общим кэшем.
+OBJECT_CACHE_L1_SIZE = 1000
+OBJECT_CACHE_TTL = 60 * 60
+
+# Ленты RSS/Atom/JSON: записей по умолчанию и максимум для ?limit=.
+# Тело ленты не больше FEED_CACHE_MAX_SIZE байт кэшируется до изменения,
+# но не дольше SYNDICATION_CACHE_TTL секунд.
+FEED_ITEMS = 50
+FEED_MAX_ITEMS = 1000
+SYNDICATION_CACHE_TTL = 60 * 10
+FEED_CACHE_MAX_SIZE = 1024 * 1024
+
+# Фоновая очередь core.jobs: заданий за проход воркера, попыток (пауза
+# между ними JOBS_RETRY_DELAY * 2**n секунд), таймаут зависшего задания.
+JOBS_BATCH_SIZE = 20
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 30
+JOBS_TIMEOUT = 60 * 10
+JOBS_POLL_INTERVAL = 1
+
+# Письма подписчикам о новых постах: получателей в одном задании и адрес
+# сайта для ссылок (у воркера нет запроса).
+NOTIFY_BATCH_SIZE = 100
+SITE_URL = "http://127.0.0.1:8000"
+
+# Компилировать все шаблоны при старте процесса (ошибка в шаблоне не даст
+# запуститься) и считать время и число рендеров каждого шаблона и
+# include в запросе: сводка на /core/metrics/ и в Server-Timing.
+TEMPLATE_PRECOMPILE = not DEBUG
+TEMPLATE_PROFILE = True
+
+# Отрендеренные карточки постов (posts.cards), общие для всех лент.
+POST_CARD_TTL = 60 * 60
+
+# Постов на странице по типам лент (по умолчанию posts.views.LIMIT_POSTS)
+# и окно номеров пагинатора: страниц с краёв и по бокам от текущей.
+FEED_PAGE_SIZES = {
+    "index": 10,
+    "group": 10,
+    "profile": 10,
+    "follow": 10,
+    "search": 10,
+}
+PAGE_RANGE_ON_EACH_SIDE = 3
+PAGE_RANGE_ON_ENDS = 1
+
+# Число постов для пагинаторов главной и ленты подписок: выборки от
+# COUNT_EXACT_BELOW строк пересчитываются не чаще раза в
+# COUNT_MAX_STALENESS секунд, меньшие считаются точно.
+COUNT_EXACT_BELOW = 1000
+COUNT_MAX_STALENESS = 60
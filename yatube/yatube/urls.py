@@ -5,10 +5,12 @@ from django.urls import include, path
 
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
     path("admin/", admin.site.urls),
     path("auth/", include("users.urls", namespace="users")),
     path("auth/", include("django.contrib.auth.urls")),
     path("about/", include("about.urls", namespace="about")),
+    path("core/", include("core.urls", namespace="core")),
 ]
 
 